@@ -1,8 +1,8 @@
 import streamlit as st
 import pandas as pd
-from ragv2 import SoccerMatchPredictor
+from ragv2 import PredictionStreamParser, SoccerMatchPredictor
+import itertools
 import os
-import time
 
 # Set page config
 st.set_page_config(
@@ -17,62 +17,67 @@ if 'predictor' not in st.session_state:
 if 'is_initialized' not in st.session_state:
     st.session_state.is_initialized = False
 if 'data_file' not in st.session_state:
-    st.session_state.data_file = None
-# new flag to start initialization from button click
-if 'start_init' not in st.session_state:
-    st.session_state.start_init = False
+    st.session_state.data_file = 'combined_leagues.csv'
+
+@st.cache_resource(show_spinner=False)
+def get_shared_predictor(data_file: str) -> SoccerMatchPredictor:
+    """Build or load the knowledge base once per server process.
+
+    The predictor is shared read-only by every browser session, so the FAISS
+    index and match data are held in memory once regardless of user count.
+    Concurrent first visitors wait on the same build.
+    """
+    predictor = SoccerMatchPredictor()
+    predictor.build_knowledge_base(data_file)
+    return predictor
 
 def initialize_knowledge_base():
-    """Initialize the FAISS index and load the knowledge base"""
+    """Attach this session to the shared knowledge base, loading it on first use"""
     try:
-        with st.spinner("🔄 Loading match data..."):
-            if not os.path.exists(st.session_state.data_file):
-                st.error(f"File not found: {st.session_state.data_file}")
-                return False
-            
-            # Create progress container
-            progress_container = st.empty()
-            progress_bar = st.progress(0)
-            
-            # Initialize predictor
-            predictor = SoccerMatchPredictor()
-            
-            # Show DataFrame preview
-            df = pd.read_csv(st.session_state.data_file)
-            st.write("Preview of the match data:")
-            st.dataframe(df.head(), hide_index=True)
-            
-            # Update progress
-            progress_container.text("⚙️ Creating FAISS index...")
-            progress_bar.progress(25)
-            
-            # Build knowledge base
-            predictor.build_knowledge_base(st.session_state.data_file)
-            progress_bar.progress(75)
-            
-            # Store in session state
-            st.session_state.predictor = predictor
+        if not os.path.exists(st.session_state.data_file):
+            st.error(f"File not found: {st.session_state.data_file}")
+            return False
+        
+        with st.spinner("🔄 Loading knowledge base..."):
+            # Sessions only hold a reference to the process-wide predictor
+            st.session_state.predictor = get_shared_predictor(st.session_state.data_file)
             st.session_state.is_initialized = True
-            
-            # Final update
-            progress_container.text("✅ Knowledge base initialized successfully!")
-            progress_bar.progress(100)
-            
-            # Clear progress indicators after a short delay
-            time.sleep(1)
-            progress_container.empty()
-            progress_bar.empty()
-            
             return True
             
     except Exception as e:
         st.error(f"Error initializing knowledge base: {str(e)}")
         return False
 
+def render_prediction_field(field: str, value: str):
+    """Render one parsed field of a prediction"""
+    if field == "Prediction":
+        if "Home Win" in value:
+            st.markdown(f"### 🏠 {field}: {value}")
+        elif "Away Win" in value:
+            st.markdown(f"### ✈️ {field}: {value}")
+        else:
+            st.markdown(f"### 🤝 {field}: {value}")
+    elif field == "Reasoning":
+        st.markdown("#### 📝 Analysis")
+        st.write(value)
+    elif field == "Confidence":
+        st.markdown("#### 📊 Confidence Level")
+        confidence = value.rstrip('%')
+        try:
+            confidence_value = float(confidence) / 100
+            st.progress(confidence_value)
+            st.write(f"{confidence}%")
+        except ValueError:
+            st.write(confidence)
+
 # Main app layout
 st.title("⚽ Soccer Match Predictor")
 st.write("Get AI-powered predictions for soccer matches based on historical data!")
 
+# Attach to the shared knowledge base before rendering anything that uses it
+if not st.session_state.is_initialized:
+    initialize_knowledge_base()
+
 # Sidebar for statistics and info
 with st.sidebar:
     st.header("About")
@@ -96,22 +101,30 @@ with st.sidebar:
             st.write(f"Leagues: {', '.join(sorted(leagues))}")
         if 'season' in df.columns:
             st.write(f"Seasons: {', '.join(map(str, sorted(df['season'].unique())))}")
-        st.write(f"Teams: {len(set(df['home_team'].unique()) | set(df['away_team'].unique()))}")# Initialize section
+        st.write(f"Teams: {len(set(df['home_team'].unique()) | set(df['away_team'].unique()))}")
+        
+        st.header("Performance")
+        metrics = st.session_state.predictor.metrics
+        for span, label in (('predict', "Prediction"), ('retrieve', "Retrieval"), ('first_token', "First token"),
+                            ('generate', "Generation")):
+            stats = metrics.percentiles(span)
+            if stats:
+                st.write(f"{label}: p50 {stats['p50']:.0f}ms, p95 {stats['p95']:.0f}ms ({stats['count']} calls)")
+        counters = {(c['name'], c['labels'].get('result')): c['value'] for c in metrics.snapshot()['counters']}
+        hits = counters.get(('prediction_cache_requests_total', 'hit'), 0)
+        precomputed = counters.get(('prediction_cache_requests_total', 'precomputed'), 0)
+        misses = counters.get(('prediction_cache_requests_total', 'miss'), 0)
+        requests = hits + precomputed + misses
+        if requests:
+            st.write(f"Prediction cache hit rate: {(hits + precomputed) / requests:.0%} "
+                     f"({hits} cached, {precomputed} precomputed, {misses} generated)")
+
+# Initialize section
 if not st.session_state.is_initialized:
     st.markdown("### 📚 Initialize Knowledge Base")
-    st.write("Using the combined leagues dataset for predictions.")
-    st.session_state.data_file = 'combined_leagues.csv'
-
-    # Button sets a flag; actual long init happens below so Streamlit reruns cleanly
-    if st.button("🚀 Initialize Knowledge Base", key="init_button"):
-        st.session_state.start_init = True
-
-    # When flag is set, perform the initialization once
-    if st.session_state.start_init:
-        succeeded = initialize_knowledge_base()
-        st.session_state.start_init = False
-        if succeeded:
-            st.success("✅ Knowledge base is ready! You can now make predictions.")
+    st.write("The knowledge base could not be loaded. Check the data file and try again.")
+    if st.button("🚀 Retry Initialization", key="init_button"):
+        st.rerun()
 else:
     # Main prediction interface
     st.markdown("### ⚽ Make Predictions")
@@ -147,74 +160,63 @@ else:
     if st.button("Get Prediction", disabled=not (home_team and away_team)):
         try:
             if st.session_state.predictor is not None:
+                # Display prediction in a nice format
+                st.markdown("### 🎯 Match Prediction")
+                st.markdown("---")
+                
+                # Stream tokens into a live placeholder and render each field as soon as its line completes
+                stream = st.session_state.predictor.predict_match_stream(home_team, away_team)
                 with st.spinner("Analyzing match data..."):
-                    prediction = st.session_state.predictor.predict_match(home_team, away_team)
-                    
-                    # Display prediction in a nice format
-                    st.markdown("### 🎯 Match Prediction")
-                    st.markdown("---")
-                    
-                    # Parse prediction components
-                    prediction_lines = prediction.split('\n')
-                    
-                    for line in prediction_lines:
-                        if line.startswith("Prediction:"):
-                            result = line.split(":")[1].strip()
-                            if "Home Win" in result:
-                                st.markdown(f"### 🏠 {line}")
-                            elif "Away Win" in result:
-                                st.markdown(f"### ✈️ {line}")
+                    first_token = next(stream, "")
+                live_text = st.empty()
+                parser = PredictionStreamParser()
+                streamed = ""
+                for token in itertools.chain([first_token], stream):
+                    streamed += token
+                    live_text.markdown(streamed)
+                    for field, value in parser.feed(token):
+                        render_prediction_field(field, value)
+                for field, value in parser.finish():
+                    render_prediction_field(field, value)
+                if parser.fields:
+                    live_text.empty()
+                
+                # Show relevant historical matches
+                st.markdown("### 📊 Recent Head-to-Head Matches")
+                if hasattr(st.session_state.predictor, 'historical_data_df'):
+                    df = st.session_state.predictor.historical_data_df
+
+                    # Find matches between the two teams
+                    matches_df = df[
+                        ((df['home_team'] == home_team) & (df['away_team'] == away_team)) |
+                        ((df['home_team'] == away_team) & (df['away_team'] == home_team))
+                    ].copy()
+
+                    # If no matches at all in DB, treat as "no matches in past 3 years"
+                    if matches_df.empty:
+                        st.info(f"No matches between **{home_team}** and **{away_team}** were found in the database. Treating this as no matches in the past 3 years.")
+                    else:
+                        # Detect a date-like column
+                        date_col = next((c for c in ['date', 'utcDate', 'utc_date', 'match_date'] if c in matches_df.columns), None)
+                        if date_col:
+                            # parse dates safely and normalize to UTC so comparisons are consistent
+                            matches_df[date_col] = pd.to_datetime(matches_df[date_col], errors='coerce', utc=True)
+                            matches_df = matches_df.sort_values(date_col, ascending=False)
+
+                            # use a UTC-aware cutoff timestamp
+                            three_years_ago = pd.Timestamp.now(tz='UTC') - pd.DateOffset(years=3)
+
+                            recent = matches_df[matches_df[date_col] >= three_years_ago]
+                            if recent.empty:
+                                st.info(f"No matches between **{home_team}** and **{away_team}** in the past 3 years.")
                             else:
-                                st.markdown(f"### 🤝 {line}")
-                        elif line.startswith("Reasoning:"):
-                            st.markdown("#### 📝 Analysis")
-                            st.write(line.split(":")[1].strip())
-                        elif line.startswith("Confidence:"):
-                            st.markdown("#### 📊 Confidence Level")
-                            try:
-                                confidence = line.split(":")[1].strip().rstrip('%')
-                                confidence_value = float(confidence) / 100
-                                st.progress(confidence_value)
-                                st.write(f"{confidence}%")
-                            except ValueError:
-                                st.write(confidence)
-                    
-                    # Show relevant historical matches
-                    st.markdown("### 📊 Recent Head-to-Head Matches")
-                    if hasattr(st.session_state.predictor, 'historical_data_df'):
-                        df = st.session_state.predictor.historical_data_df
-
-                        # Find matches between the two teams
-                        matches_df = df[
-                            ((df['home_team'] == home_team) & (df['away_team'] == away_team)) |
-                            ((df['home_team'] == away_team) & (df['away_team'] == home_team))
-                        ].copy()
-
-                        # If no matches at all in DB, treat as "no matches in past 3 years"
-                        if matches_df.empty:
-                            st.info(f"No matches between **{home_team}** and **{away_team}** were found in the database. Treating this as no matches in the past 3 years.")
+                                st.dataframe(
+                                    recent[[date_col, 'home_team', 'home_score', 'away_score', 'away_team']].head(5),
+                                    hide_index=True
+                                )
                         else:
-                            # Detect a date-like column
-                            date_col = next((c for c in ['date', 'utcDate', 'utc_date', 'match_date'] if c in matches_df.columns), None)
-                            if date_col:
-                                # parse dates safely and normalize to UTC so comparisons are consistent
-                                matches_df[date_col] = pd.to_datetime(matches_df[date_col], errors='coerce', utc=True)
-                                matches_df = matches_df.sort_values(date_col, ascending=False)
-
-                                # use a UTC-aware cutoff timestamp
-                                three_years_ago = pd.Timestamp.now(tz='UTC') - pd.DateOffset(years=3)
-
-                                recent = matches_df[matches_df[date_col] >= three_years_ago]
-                                if recent.empty:
-                                    st.info(f"No matches between **{home_team}** and **{away_team}** in the past 3 years.")
-                                else:
-                                    st.dataframe(
-                                        recent[[date_col, 'home_team', 'home_score', 'away_score', 'away_team']].head(5),
-                                        hide_index=True
-                                    )
-                            else:
-                                # No date column available — cannot compute recency.
-                                st.info(f"No date information available for historical matches. Treating this as no matches in the past 3 years between **{home_team}** and **{away_team}**.")
+                            # No date column available — cannot compute recency.
+                            st.info(f"No date information available for historical matches. Treating this as no matches in the past 3 years between **{home_team}** and **{away_team}**.")
             else:
                 st.error("Prediction system not initialized. Please initialize the knowledge base first.")
         except Exception as e:
@@ -236,22 +238,16 @@ def _send_chat_callback():
         st.session_state['_chat_info'] = "Please enter a question before sending."
         return
 
-    # append user message
+    # append user message; the reply is streamed in while the page renders
+    # so the callback returns immediately instead of waiting on the LLM
     st.session_state.chat_history.append({"role": "user", "text": query})
-
-    # generate assistant reply
-    if st.session_state.get("predictor") is not None and hasattr(st.session_state.predictor, "answer_query"):
-        try:
-            # call predictor (may block; consider running asynchronously if needed)
-            reply = st.session_state.predictor.answer_query(query)
-        except Exception as e:
-            reply = f"Error generating reply: {e}"
+    if st.session_state.get("predictor") is not None:
+        st.session_state['_chat_pending'] = query
     else:
-        reply = ("Knowledge base not initialized. Please initialize it to enable chat."
-                 if st.session_state.get("predictor") is None
-                 else "Predictor does not implement answer_query(question: str) -> str.")
-
-    st.session_state.chat_history.append({"role": "assistant", "text": reply})
+        st.session_state.chat_history.append({
+            "role": "assistant",
+            "text": "Knowledge base not initialized. Please initialize it to enable chat."
+        })
 
     # clear input (allowed inside callback)
     st.session_state.chat_input = ""
@@ -292,6 +288,17 @@ if st.session_state.chat_history:
         else:
             st.markdown(f"**Assistant:** {msg['text']}")
 
+# Stream the answer to a question sent from the callback
+pending_question = st.session_state.pop('_chat_pending', None)
+if pending_question is not None:
+    st.markdown("**Assistant:**")
+    try:
+        reply = st.write_stream(st.session_state.predictor.answer_query_stream(pending_question))
+    except Exception as e:
+        reply = f"Error generating reply: {e}"
+        st.markdown(reply)
+    st.session_state.chat_history.append({"role": "assistant", "text": reply})
+
 # Footer (chat feature removed)
 st.markdown("---")
 st.markdown("Made with ❤️ by Your Team")
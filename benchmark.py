@@ -0,0 +1,204 @@
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from typing import List
+
+import numpy as np
+import pandas as pd
+from llama_index.core import Settings
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.llms import MockLLM
+
+from embeddings import EmbeddingPipeline
+from kb_store import DEFAULT_INDEX_TYPE
+from prediction_cache import PredictionCache
+from prediction_store import PrecomputedPredictions
+
+
+# Dataset multiples benchmarked by default
+DEFAULT_SCALES = (1, 10, 100)
+
+# Synthetic copies of the history are shifted back this many days per copy
+COPY_SHIFT_DAYS = 3 * 365
+
+
+class StubEmbedding(BaseEmbedding):
+    """Deterministic offline embedding: a unit vector seeded by the text's hash.
+
+    Unlike a constant mock embedding, distinct texts get distinct vectors, so
+    FAISS training and search behave like they do on real embeddings.
+    """
+
+    embed_dim: int = 768
+
+    def _embed(self, text: str) -> List[float]:
+        seed = int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+        vector = np.random.default_rng(seed).standard_normal(self.embed_dim).astype('float32')
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._embed(text)
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._embed(query)
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._embed(query)
+
+
+def synthetic_history(df: pd.DataFrame, scale: int) -> pd.DataFrame:
+    """Repeat the match history `scale` times, each copy earlier in time with new match ids."""
+    match_ids = pd.to_numeric(df['match_id'], errors='coerce')
+    id_span = int(match_ids.max() - match_ids.min()) + 1
+    dates = pd.to_datetime(df['utcDate'], errors='coerce', utc=True)
+    seasons = pd.to_numeric(df['season'], errors='coerce')
+
+    copies = []
+    for copy in range(scale):
+        shifted = df.copy()
+        shifted['match_id'] = match_ids + copy * id_span
+        shifted['utcDate'] = (dates - pd.Timedelta(days=copy * COPY_SHIFT_DAYS)).dt.strftime('%Y-%m-%dT%H:%M:%SZ')
+        shifted['season'] = seasons - copy * 3
+        copies.append(shifted)
+    return pd.concat(copies, ignore_index=True)
+
+
+def sample_fixtures(df: pd.DataFrame, count: int, seed: int = 0) -> List[tuple]:
+    """Pick `count` (home, away) pairs from played matches, deterministically."""
+    played = df[df['winner'].notna()][['home_team', 'away_team']].drop_duplicates()
+    rows = played.sample(n=count, replace=len(played) < count, random_state=seed)
+    return list(rows.itertuples(index=False, name=None))
+
+
+def percentiles(values_ms: List[float]) -> dict:
+    values = np.asarray(values_ms, dtype='float64')
+    if values.size == 0:
+        return {}
+    return {
+        'mean': float(values.mean()),
+        'p50': float(np.percentile(values, 50)),
+        'p95': float(np.percentile(values, 95)),
+        'p99': float(np.percentile(values, 99)),
+        'max': float(values.max()),
+    }
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_scale(data_path: str, scale: int, num_predictions: int, index_type: str,
+              embed_dim: int, llm_tokens: int) -> dict:
+    """Benchmark one dataset size; meant to run in a fresh process so peak RSS is per scale."""
+    Settings.embed_model = StubEmbedding(model_name='stub', embed_dim=embed_dim)
+    Settings.llm = MockLLM(max_tokens=llm_tokens)
+    from ragv2 import SoccerMatchPredictor
+
+    with tempfile.TemporaryDirectory() as workdir:
+        history = synthetic_history(pd.read_csv(data_path), scale)
+        csv_path = os.path.join(workdir, 'history.csv')
+        history.to_csv(csv_path, index=False)
+        persist_dir = os.path.join(workdir, 'storage')
+
+        def make_predictor():
+            return SoccerMatchPredictor(
+                persist_dir=persist_dir,
+                embedding_pipeline=EmbeddingPipeline(cache_path=None),
+                prediction_cache=PredictionCache(max_entries=0, disk_path=None),
+                precomputed=PrecomputedPredictions(path=None),
+                index_type=index_type,
+            )
+
+        # Pipeline progress output would swamp the results
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            make_predictor().build_knowledge_base(csv_path)
+            build_seconds = time.perf_counter() - start
+
+            # A second predictor loads what the first one persisted
+            start = time.perf_counter()
+            predictor = make_predictor()
+            predictor.build_knowledge_base(csv_path)
+            load_seconds = time.perf_counter() - start
+
+            timings = {'retrieve': [], 'format': [], 'generate': [], 'total': []}
+            for home_team, away_team in sample_fixtures(history, num_predictions):
+                start = time.perf_counter()
+                predictor.predict_match(home_team, away_team)
+                elapsed = time.perf_counter() - start
+                for stage in ('retrieve', 'format', 'generate'):
+                    timings[stage].append(predictor.last_timings[stage] * 1000)
+                timings['total'].append(elapsed * 1000)
+
+    return {
+        'scale': scale,
+        'rows': len(history),
+        'build': {'seconds': build_seconds, 'rows_per_sec': len(history) / build_seconds},
+        'load_seconds': load_seconds,
+        'retrieval_ms': percentiles(timings['retrieve']),
+        'format_ms': percentiles(timings['format']),
+        'generate_ms': percentiles(timings['generate']),
+        'predict_match_ms': percentiles(timings['total']),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def run_benchmarks(data_path: str, scales=DEFAULT_SCALES, num_predictions: int = 200,
+                   index_type: str = DEFAULT_INDEX_TYPE, embed_dim: int = 768, llm_tokens: int = 64) -> dict:
+    """Run every scale in its own process and collect the results."""
+    results = []
+    context = multiprocessing.get_context('spawn')
+    for scale in scales:
+        print(f"Benchmarking {scale}x...", file=sys.stderr)
+        with context.Pool(1) as pool:
+            result = pool.apply(run_scale, (data_path, scale, num_predictions, index_type, embed_dim, llm_tokens))
+        print(f"  {result['rows']} rows: build {result['build']['rows_per_sec']:.0f} rows/sec, "
+              f"retrieval p95 {result['retrieval_ms']['p95']:.1f}ms, "
+              f"predict p95 {result['predict_match_ms']['p95']:.1f}ms, peak RSS {result['peak_rss_mb']:.0f}MB",
+              file=sys.stderr)
+        results.append(result)
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'data': data_path,
+            'index_type': index_type,
+            'embed_dim': embed_dim,
+            'num_predictions': num_predictions,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'results': results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmark of knowledge-base build, retrieval and prediction")
+    parser.add_argument('--data', default='combined_leagues.csv', help="Match CSV to scale up")
+    parser.add_argument('--scales', default=",".join(map(str, DEFAULT_SCALES)),
+                        help="Comma-separated dataset multiples, e.g. 1,10,100")
+    parser.add_argument('--predictions', type=int, default=200, help="predict_match calls per scale")
+    parser.add_argument('--index-type', default=DEFAULT_INDEX_TYPE, help="FAISS index type to benchmark")
+    parser.add_argument('--dim', type=int, default=768, help="Stub embedding dimension")
+    parser.add_argument('--output', default='benchmark_results.json', help="JSON output file ('-' for stdout)")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.data, [int(s) for s in args.scales.split(',')], args.predictions,
+                            args.index_type, args.dim)
+    if args.output == '-':
+        print(json.dumps(report, indent=2))
+    else:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote benchmark results to {args.output}", file=sys.stderr)
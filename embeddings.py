@@ -0,0 +1,149 @@
+import hashlib
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from llama_index.core import Settings
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.schema import BaseNode, MetadataMode
+
+
+# Persistent embedding cache shared across rebuilds (override with SOCCER_EMBED_CACHE)
+DEFAULT_CACHE_PATH = os.environ.get('SOCCER_EMBED_CACHE', os.path.join('storage', 'embedding_cache.sqlite'))
+
+
+class EmbeddingCache:
+    """SQLite-backed cache of embeddings keyed by the SHA-256 of the embedded text."""
+
+    def __init__(self, cache_path: str, model_name: str):
+        cache_dir = os.path.dirname(cache_path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        self.model_name = model_name
+        self.conn = sqlite3.connect(cache_path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, sha TEXT NOT NULL, embedding BLOB NOT NULL, "
+            "PRIMARY KEY (model, sha))"
+        )
+        self.conn.commit()
+
+    def get_many(self, shas: Sequence[str]) -> Dict[str, List[float]]:
+        found = {}
+        shas = list(shas)
+        # Stay below SQLite's bound-parameter limit
+        for start in range(0, len(shas), 500):
+            chunk = shas[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT sha, embedding FROM embeddings WHERE model = ? AND sha IN ({placeholders})",
+                [self.model_name, *chunk]
+            )
+            for sha, blob in rows:
+                found[sha] = np.frombuffer(blob, dtype='float32').tolist()
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (model, sha, embedding) VALUES (?, ?, ?)",
+            [(self.model_name, sha, np.asarray(emb, dtype='float32').tobytes()) for sha, emb in items.items()]
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+def text_sha(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class EmbeddingPipeline:
+    """Embed nodes in batches on a bounded thread pool, reusing cached embeddings.
+
+    Texts already in the cache are never sent to the embedding endpoint, so
+    re-running over an unchanged CSV makes no embedding calls at all.
+    """
+
+    def __init__(self, embed_model: Optional[BaseEmbedding] = None, batch_size: int = 64,
+                 num_workers: int = 4, cache_path: Optional[str] = DEFAULT_CACHE_PATH,
+                 max_retries: int = 3, retry_backoff: float = 1.0):
+        self._embed_model = embed_model
+        self.batch_size = batch_size
+        self.num_workers = num_workers
+        self.cache_path = cache_path
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.last_stats = None
+
+    @property
+    def embed_model(self) -> BaseEmbedding:
+        # Resolved lazily so a model configured on Settings after construction is used
+        return self._embed_model or Settings.embed_model
+
+    def embed_nodes(self, nodes: Sequence[BaseNode]) -> Sequence[BaseNode]:
+        """Set `embedding` on every node that does not have one yet."""
+        start = time.perf_counter()
+        pending = [node for node in nodes if node.embedding is None]
+        shas = [text_sha(node.get_content(metadata_mode=MetadataMode.EMBED)) for node in pending]
+
+        cache = EmbeddingCache(self.cache_path, self.embed_model.model_name) if self.cache_path else None
+        try:
+            embeddings = cache.get_many(set(shas)) if cache else {}
+            num_cached = sum(1 for sha in shas if sha in embeddings)
+
+            # Embed each distinct uncached text once
+            to_embed = {}
+            for node, sha in zip(pending, shas):
+                if sha not in embeddings and sha not in to_embed:
+                    to_embed[sha] = node.get_content(metadata_mode=MetadataMode.EMBED)
+
+            if to_embed:
+                new_embeddings = self._embed_texts(list(to_embed.keys()), list(to_embed.values()))
+                embeddings.update(new_embeddings)
+                if cache:
+                    cache.put_many(new_embeddings)
+        finally:
+            if cache:
+                cache.close()
+
+        for node, sha in zip(pending, shas):
+            node.embedding = embeddings[sha]
+
+        elapsed = time.perf_counter() - start
+        self.last_stats = {
+            'documents': len(pending),
+            'cached': num_cached,
+            'embedded': len(to_embed),
+            'seconds': elapsed,
+            'docs_per_sec': len(pending) / elapsed if elapsed > 0 else 0.0,
+        }
+        print(f"Embedded {len(pending)} documents ({num_cached} cached, {len(to_embed)} new) "
+              f"in {elapsed:.1f}s ({self.last_stats['docs_per_sec']:.1f} docs/sec)")
+        return nodes
+
+    def _embed_texts(self, shas: List[str], texts: List[str]) -> Dict[str, List[float]]:
+        batches = [
+            (shas[i:i + self.batch_size], texts[i:i + self.batch_size])
+            for i in range(0, len(texts), self.batch_size)
+        ]
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.num_workers) as executor:
+            for batch_shas, batch_embeddings in executor.map(self._embed_batch, batches):
+                results.update(zip(batch_shas, batch_embeddings))
+        return results
+
+    def _embed_batch(self, batch):
+        batch_shas, batch_texts = batch
+        for attempt in range(self.max_retries + 1):
+            try:
+                return batch_shas, self.embed_model.get_text_embedding_batch(batch_texts)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self.retry_backoff * (2 ** attempt)
+                print(f"Embedding batch failed ({e}), retrying in {delay:.1f}s...")
+                time.sleep(delay)
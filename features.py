@@ -0,0 +1,195 @@
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# Highest goal count considered when turning Poisson rates into outcome probabilities
+MAX_GOALS = 10
+
+_GOALS = np.arange(MAX_GOALS + 1)
+_FACTORIALS = np.concatenate([[1.0], np.cumprod(_GOALS[1:], dtype='float64')])
+
+
+class TeamFeatures:
+    """Precomputed per-team form, venue goal rates, head-to-head records and Elo ratings.
+
+    Everything is derived from finished matches at construction time, so
+    lookups and the Poisson baseline in `predict` are plain dictionary and
+    small NumPy operations.
+    """
+
+    def __init__(self, df: pd.DataFrame, form_matches: int = 5, elo_k: float = 20.0,
+                 home_advantage: float = 60.0, prior_matches: float = 5.0):
+        self.form_matches = form_matches
+        home_goals = pd.to_numeric(df['home_score'], errors='coerce')
+        away_goals = pd.to_numeric(df['away_score'], errors='coerce')
+        played = df['winner'].notna() & home_goals.notna() & away_goals.notna()
+        played &= df['home_team'].notna() & df['away_team'].notna()
+
+        matches = pd.DataFrame({
+            'date': pd.to_datetime(df.loc[played, 'utcDate'], errors='coerce', utc=True),
+            'home_team': df.loc[played, 'home_team'].astype(str),
+            'away_team': df.loc[played, 'away_team'].astype(str),
+            'home_goals': home_goals[played].astype('int64'),
+            'away_goals': away_goals[played].astype('int64'),
+        }).sort_values('date', kind='stable').reset_index(drop=True)
+
+        self.league_home_goals = float(matches['home_goals'].mean()) if len(matches) else 1.5
+        self.league_away_goals = float(matches['away_goals'].mean()) if len(matches) else 1.2
+
+        long = self._long_format(matches)
+        self._form = self._build_form(long)
+        self._strengths = self._build_strengths(long, prior_matches)
+        self._h2h = self._build_head_to_head(matches)
+        self.elo = self._build_elo(matches, elo_k, home_advantage)
+
+    @staticmethod
+    def _long_format(matches: pd.DataFrame) -> pd.DataFrame:
+        """One row per team per match, in chronological order."""
+        home = pd.DataFrame({
+            'date': matches['date'], 'team': matches['home_team'], 'is_home': True,
+            'goals_for': matches['home_goals'], 'goals_against': matches['away_goals'],
+        })
+        away = pd.DataFrame({
+            'date': matches['date'], 'team': matches['away_team'], 'is_home': False,
+            'goals_for': matches['away_goals'], 'goals_against': matches['home_goals'],
+        })
+        long = pd.concat([home, away]).sort_values('date', kind='stable').reset_index(drop=True)
+        diff = long['goals_for'] - long['goals_against']
+        long['result'] = np.select([diff > 0, diff < 0], ['W', 'L'], 'D')
+        long['points'] = np.select([diff > 0, diff < 0], [3, 0], 1)
+        return long
+
+    def _build_form(self, long: pd.DataFrame) -> Dict[str, dict]:
+        recent = long.groupby('team', sort=False).tail(self.form_matches)
+        grouped = recent.groupby('team', sort=False)
+        form = pd.DataFrame({
+            'form': grouped['result'].agg(''.join),
+            'points_per_game': grouped['points'].mean(),
+            'goals_for': grouped['goals_for'].mean(),
+            'goals_against': grouped['goals_against'].mean(),
+        })
+        return form.to_dict('index')
+
+    def _build_strengths(self, long: pd.DataFrame, prior_matches: float) -> Dict[str, dict]:
+        """Attack/defence strengths by venue, shrunk towards the league average."""
+        totals = long.groupby(['team', 'is_home']).agg(
+            matches=('goals_for', 'size'),
+            goals_for=('goals_for', 'sum'),
+            goals_against=('goals_against', 'sum'),
+        ).reset_index()
+        is_home = totals['is_home'].values
+        scored_avg = np.where(is_home, self.league_home_goals, self.league_away_goals)
+        conceded_avg = np.where(is_home, self.league_away_goals, self.league_home_goals)
+        n = totals['matches'].values
+
+        venue = np.where(is_home, 'home', 'away')
+        features = pd.DataFrame({
+            'matches': n,
+            'goals_for': totals['goals_for'].values / n,
+            'goals_against': totals['goals_against'].values / n,
+            'attack': (totals['goals_for'].values + prior_matches * scored_avg) / (n + prior_matches) / scored_avg,
+            'defence': (totals['goals_against'].values + prior_matches * conceded_avg) / (n + prior_matches) / conceded_avg,
+        }, index=pd.MultiIndex.from_arrays([totals['team'].values, venue], names=['team', 'venue']))
+
+        # Flatten to {team: {'home_attack': ..., 'away_goals_for': ..., ...}}
+        wide = features.unstack('venue')
+        wide.columns = [f"{venue}_{name}" for name, venue in wide.columns]
+        return {
+            team: {key: value for key, value in row.items() if not pd.isna(value)}
+            for team, row in wide.to_dict('index').items()
+        }
+
+    @staticmethod
+    def _build_head_to_head(matches: pd.DataFrame) -> Dict[Tuple[str, str], dict]:
+        """Win/draw/loss counts per ordered (team, opponent) pair, venue ignored."""
+        diff = np.concatenate([
+            matches['home_goals'].values - matches['away_goals'].values,
+            matches['away_goals'].values - matches['home_goals'].values,
+        ])
+        both = pd.DataFrame({
+            'team': np.concatenate([matches['home_team'].values, matches['away_team'].values]),
+            'opponent': np.concatenate([matches['away_team'].values, matches['home_team'].values]),
+            'matches': 1,
+            'wins': (diff > 0).astype('int64'),
+            'draws': (diff == 0).astype('int64'),
+            'losses': (diff < 0).astype('int64'),
+        })
+        return both.groupby(['team', 'opponent']).sum().to_dict('index')
+
+    @staticmethod
+    def _build_elo(matches: pd.DataFrame, k: float, home_advantage: float) -> Dict[str, float]:
+        """Elo ratings updated match by match in kickoff order."""
+        ratings = {}
+        scores = np.sign(matches['home_goals'].values - matches['away_goals'].values) * 0.5 + 0.5
+        for home, away, score in zip(matches['home_team'].values, matches['away_team'].values, scores):
+            home_rating = ratings.get(home, 1500.0)
+            away_rating = ratings.get(away, 1500.0)
+            expected = 1.0 / (1.0 + 10 ** ((away_rating - home_rating - home_advantage) / 400.0))
+            delta = k * (score - expected)
+            ratings[home] = home_rating + delta
+            ratings[away] = away_rating - delta
+        return ratings
+
+    def team_form(self, team: str) -> dict:
+        return self._form.get(team, {'form': '', 'points_per_game': 0.0, 'goals_for': 0.0, 'goals_against': 0.0})
+
+    def head_to_head(self, team: str, opponent: str) -> dict:
+        return self._h2h.get((team, opponent), {'matches': 0, 'wins': 0, 'draws': 0, 'losses': 0})
+
+    def predict(self, home_team: str, away_team: str) -> dict:
+        """Poisson baseline: outcome probabilities from venue attack/defence strengths."""
+        home = self._strengths.get(home_team, {})
+        away = self._strengths.get(away_team, {})
+        home_rate = self.league_home_goals * home.get('home_attack', 1.0) * away.get('away_defence', 1.0)
+        away_rate = self.league_away_goals * away.get('away_attack', 1.0) * home.get('home_defence', 1.0)
+
+        home_pmf = np.exp(-home_rate) * home_rate ** _GOALS / _FACTORIALS
+        away_pmf = np.exp(-away_rate) * away_rate ** _GOALS / _FACTORIALS
+        scores = np.outer(home_pmf, away_pmf)
+        total = scores.sum()
+        # Most likely scoreline overall and within each outcome
+        likely = {}
+        for outcome, region in (('home_win', np.tril(scores, -1)), ('draw', np.diag(np.diag(scores))),
+                                ('away_win', np.triu(scores, 1))):
+            home_goals, away_goals = np.unravel_index(np.argmax(region), scores.shape)
+            likely[outcome] = (int(home_goals), int(away_goals))
+        likely_home, likely_away = np.unravel_index(np.argmax(scores), scores.shape)
+
+        return {
+            'home_win': float(np.tril(scores, -1).sum() / total),
+            'draw': float(np.trace(scores) / total),
+            'away_win': float(np.triu(scores, 1).sum() / total),
+            'expected_home_goals': home_rate,
+            'expected_away_goals': away_rate,
+            'likely_score': (int(likely_home), int(likely_away)),
+            'likely_scores': likely,
+            'home_elo': self.elo.get(home_team, 1500.0),
+            'away_elo': self.elo.get(away_team, 1500.0),
+        }
+
+    def describe(self, home_team: str, away_team: str) -> str:
+        """Compact text summary of the features for a fixture, for use in prompts."""
+        lines = []
+        for team, venue in ((home_team, 'home'), (away_team, 'away')):
+            form = self.team_form(team)
+            strengths = self._strengths.get(team, {})
+            lines.append(
+                f"{team}: Elo {self.elo.get(team, 1500.0):.0f}, last {self.form_matches} {form['form'] or 'n/a'} "
+                f"({form['points_per_game']:.2f} pts/game, {form['goals_for']:.1f} GF, {form['goals_against']:.1f} GA), "
+                f"{venue} goals {strengths.get(f'{venue}_goals_for', 0.0):.2f} for / "
+                f"{strengths.get(f'{venue}_goals_against', 0.0):.2f} against per game"
+            )
+        h2h = self.head_to_head(home_team, away_team)
+        lines.append(
+            f"Head-to-head ({home_team} perspective): {h2h['matches']} played, "
+            f"{h2h['wins']}W {h2h['draws']}D {h2h['losses']}L"
+        )
+        baseline = self.predict(home_team, away_team)
+        lines.append(
+            f"Statistical baseline: home win {baseline['home_win']:.0%}, draw {baseline['draw']:.0%}, "
+            f"away win {baseline['away_win']:.0%}, expected goals "
+            f"{baseline['expected_home_goals']:.2f}-{baseline['expected_away_goals']:.2f}"
+        )
+        return "\n".join(lines)
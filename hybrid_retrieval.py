@@ -0,0 +1,150 @@
+import math
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from llama_index.core import VectorStoreIndex
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.schema import NodeWithScore, QueryBundle
+from llama_index.core.vector_stores import MetadataFilter, MetadataFilters
+
+from match_index import TeamNameResolver, _TEAM_NAME_NOISE, normalize_name
+
+
+# BM25 term-frequency saturation and length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Reciprocal rank fusion constant; larger values flatten the gap between ranks
+RRF_K = 60
+
+# Fields of a match indexed for lexical search
+LEXICAL_FIELDS = ('home_team', 'away_team', 'competition', 'referee')
+
+
+def team_token(team: str) -> str:
+    """Whole-name token, so "Manchester City FC" and "Manchester United FC" never share it."""
+    return "team:" + normalize_name(team).replace(' ', '_')
+
+
+def _value_tokens(field: str, value: str) -> List[str]:
+    if field in ('home_team', 'away_team'):
+        full = team_token(value)
+    else:
+        full = f"{field}:" + normalize_name(value).replace(' ', '_')
+    words = [word for word in normalize_name(value).split() if word not in _TEAM_NAME_NOISE]
+    return [full] + words
+
+
+def query_tokens(text: str, teams: Iterable[str] = ()) -> List[str]:
+    """Tokens of a free-text query plus whole-name tokens for the teams it mentions."""
+    words = [word for word in normalize_name(text).split() if word not in _TEAM_NAME_NOISE]
+    return list(dict.fromkeys([team_token(team) for team in teams] + words))
+
+
+class LexicalIndex:
+    """BM25 inverted index over the team, competition and referee tokens of every match.
+
+    Each distinct field value is tokenized once and its postings are added
+    for all matches sharing it, so building stays cheap on large tables.
+    Searching touches only the postings of the query's tokens.
+    """
+
+    def __init__(self, docs: pd.DataFrame, k1: float = BM25_K1, b: float = BM25_B):
+        docs = docs[docs['match_id'].notna()]
+        self.ids = docs['match_id'].to_numpy(dtype='int64')
+        # Categorical, so filtering by competition compares integer codes
+        self._competitions = docs['competition'].astype('category').array
+        num_docs = len(docs)
+
+        positions_by_token = defaultdict(list)
+        lengths = np.zeros(num_docs, dtype='float64')
+        for field in LEXICAL_FIELDS:
+            if field not in docs.columns:
+                continue
+            values = docs[field].astype(object)
+            for value, positions in values.groupby(values, sort=False).indices.items():
+                tokens = _value_tokens(field, str(value))
+                lengths[positions] += len(tokens)
+                for token in tokens:
+                    positions_by_token[token].append(positions)
+
+        avg_length = lengths.mean() if num_docs else 0.0
+        # Per-document length normalization of the BM25 denominator
+        self._norm = k1 * (1 - b + b * lengths / avg_length) if avg_length else np.full(num_docs, k1)
+        self._k1 = k1
+        self._postings: Dict[str, Tuple[np.ndarray, np.ndarray, float]] = {}
+        for token, chunks in positions_by_token.items():
+            positions, tf = np.unique(np.concatenate(chunks), return_counts=True)
+            idf = math.log(1 + (num_docs - len(positions) + 0.5) / (len(positions) + 0.5))
+            # Row positions and term counts are small; narrow dtypes halve the postings
+            self._postings[token] = (positions.astype('int32'), tf.astype('float32'), idf)
+
+    def search(self, tokens: List[str], top_k: int = 10,
+               competition: Optional[str] = None) -> List[Tuple[str, float]]:
+        """Best `top_k` (match_id, BM25 score) pairs for `tokens`, optionally within one competition."""
+        scores = np.zeros(len(self.ids), dtype='float64')
+        for token in tokens:
+            posting = self._postings.get(token)
+            if posting is None:
+                continue
+            positions, tf, idf = posting
+            scores[positions] += idf * tf * (self._k1 + 1) / (tf + self._norm[positions])
+        if competition:
+            scores[np.asarray(self._competitions != competition)] = 0.0
+
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > top_k:
+            candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+        # Ties (e.g. every meeting of two teams) go to the later rows, the most recent in date-ordered tables
+        candidates = candidates[np.lexsort((-candidates, -scores[candidates]))]
+        return [(str(self.ids[i]), float(scores[i])) for i in candidates]
+
+
+class HybridRetriever(BaseRetriever):
+    """Fuse FAISS similarity search with BM25 lexical search by reciprocal rank fusion.
+
+    Near-identical team names embed close together, so the lexical side
+    matches exact team, competition and referee tokens while the vector side
+    still contributes semantically related matches.
+    """
+
+    def __init__(self, index: VectorStoreIndex, lexical_index: LexicalIndex,
+                 resolver: Optional[TeamNameResolver] = None, similarity_top_k: int = 5,
+                 lexical_top_k: int = 10, top_k: int = 10, competition: Optional[str] = None,
+                 rrf_k: int = RRF_K):
+        super().__init__()
+        self._index = index
+        self._lexical_index = lexical_index
+        self._resolver = resolver
+        self._similarity_top_k = similarity_top_k
+        self._lexical_top_k = lexical_top_k
+        self._top_k = top_k
+        self._competition = competition
+        self._rrf_k = rrf_k
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        filters = None
+        if self._competition:
+            filters = MetadataFilters(filters=[MetadataFilter(key='competition', value=self._competition)])
+        vector_nodes = self._index.as_retriever(
+            similarity_top_k=self._similarity_top_k, filters=filters
+        ).retrieve(query_bundle)
+
+        teams = self._resolver.find_teams(query_bundle.query_str) if self._resolver else []
+        lexical_hits = self._lexical_index.search(
+            query_tokens(query_bundle.query_str, teams), self._lexical_top_k, self._competition
+        )
+
+        fused = defaultdict(float)
+        for ranking in ([node.node_id for node in vector_nodes], [match_id for match_id, _ in lexical_hits]):
+            for rank, node_id in enumerate(ranking):
+                fused[node_id] += 1.0 / (self._rrf_k + rank + 1)
+        ranked = sorted(fused, key=fused.get, reverse=True)[:self._top_k]
+
+        nodes = {node.node_id: node.node for node in vector_nodes}
+        missing = [node_id for node_id in ranked if node_id not in nodes]
+        if missing:
+            nodes.update((node.node_id, node) for node in self._index.vector_store.get_nodes(missing))
+        return [NodeWithScore(node=nodes[node_id], score=fused[node_id]) for node_id in ranked if node_id in nodes]
@@ -0,0 +1,94 @@
+import time
+from typing import Dict, List, Optional, Sequence
+
+import faiss
+import numpy as np
+
+from kb_store import create_match_faiss_index, index_description, set_search_params
+
+
+# Index types compared by default, and the query-time settings swept for each
+REPORT_INDEX_TYPES = ('flat', 'ivf', 'hnsw', 'ivfpq', 'ivfsq8')
+NPROBE_VALUES = (1, 4, 16, 64)
+EF_SEARCH_VALUES = (16, 32, 64, 128)
+
+
+def recall_latency_report(vectors: np.ndarray, index_types: Sequence[str] = REPORT_INDEX_TYPES, k: int = 10,
+                          num_queries: int = 200, seed: int = 0,
+                          nprobe_values: Sequence[int] = NPROBE_VALUES,
+                          ef_search_values: Sequence[int] = EF_SEARCH_VALUES) -> List[Dict]:
+    """Measure recall@k and single-query latency of each index type against exact search.
+
+    `num_queries` vectors are held out as queries and the rest are indexed.
+    Each row covers one index type at one nprobe/efSearch setting and reports
+    recall@k, mean and p95 latency, bytes per vector and build time.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype='float32')
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(vectors))
+    num_queries = min(num_queries, max(1, len(vectors) // 10))
+    queries, base = vectors[order[:num_queries]], vectors[order[num_queries:]]
+    ids = np.arange(len(base), dtype='int64')
+    dimension = vectors.shape[1]
+
+    exact = faiss.IndexFlatL2(dimension)
+    exact.add(base)
+    _, truth = exact.search(queries, k)
+
+    rows = []
+    for index_type in index_types:
+        start = time.perf_counter()
+        index = create_match_faiss_index(dimension, index_type, len(base))
+        if not index.is_trained:
+            index.train(base)
+        index.add_with_ids(base, ids)
+        build_seconds = time.perf_counter() - start
+        bytes_per_vector = faiss.serialize_index(index).nbytes / max(1, len(base))
+
+        for params in _param_grid(index, nprobe_values, ef_search_values):
+            set_search_params(index, params)
+            latencies = []
+            found = np.empty((num_queries, k), dtype='int64')
+            for i in range(num_queries):
+                query_start = time.perf_counter()
+                _, labels = index.search(queries[i:i + 1], k)
+                latencies.append(time.perf_counter() - query_start)
+                found[i] = labels[0]
+            recall = np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)])
+            rows.append({
+                'index_type': index_type,
+                'index': index_description(index),
+                'params': params,
+                f'recall@{k}': float(recall),
+                'latency_ms': float(np.mean(latencies) * 1000),
+                'p95_ms': float(np.percentile(latencies, 95) * 1000),
+                'bytes_per_vector': float(bytes_per_vector),
+                'build_seconds': build_seconds,
+            })
+    return rows
+
+
+def _param_grid(index, nprobe_values: Sequence[int], ef_search_values: Sequence[int]) -> List[Dict]:
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        return [{'nprobe': n} for n in sorted({min(n, ivf.nlist) for n in nprobe_values})]
+    if 'HNSW' in index_description(index):
+        return [{'efSearch': ef} for ef in ef_search_values]
+    return [{}]
+
+
+def format_report(rows: List[Dict], k: Optional[int] = None) -> str:
+    """Render report rows as a fixed-width text table."""
+    if not rows:
+        return "No results"
+    recall_key = f'recall@{k}' if k else next(key for key in rows[0] if key.startswith('recall@'))
+    lines = [f"{'type':<8} {'index':<26} {'params':<14} {recall_key:>10} {'mean ms':>8} {'p95 ms':>8} "
+             f"{'bytes/vec':>10} {'build s':>8}"]
+    for row in rows:
+        params = ",".join(f"{key}={value}" for key, value in row['params'].items()) or "-"
+        lines.append(
+            f"{row['index_type']:<8} {row['index']:<26} {params:<14} {row[recall_key]:>10.3f} "
+            f"{row['latency_ms']:>8.3f} {row['p95_ms']:>8.3f} {row['bytes_per_vector']:>10.0f} "
+            f"{row['build_seconds']:>8.2f}"
+        )
+    return "\n".join(lines)
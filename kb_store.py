@@ -0,0 +1,496 @@
+import hashlib
+import json
+import math
+import os
+import shutil
+import time
+from typing import Any, Callable, List, Optional, Sequence
+
+import faiss
+import numpy as np
+import pandas as pd
+from llama_index.core import VectorStoreIndex
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.schema import BaseNode
+from llama_index.core.vector_stores.types import (
+    FilterCondition,
+    FilterOperator,
+    MetadataFilters,
+    VectorStoreQuery,
+    VectorStoreQueryResult,
+)
+from llama_index.vector_stores.faiss import FaissVectorStore
+
+
+# Directory the knowledge base is persisted to (override with SOCCER_INDEX_DIR)
+DEFAULT_PERSIST_DIR = os.environ.get('SOCCER_INDEX_DIR', 'storage')
+
+MANIFEST_FNAME = 'manifest.json'
+VECTOR_STORE_FNAME = 'default__vector_store.json'
+# Match ids and document text hashes of the indexed vectors
+DOCUMENTS_FNAME = 'documents.npz'
+
+# Each persist writes a new subdirectory with this prefix; the manifest names the current one
+STORE_DIR_PREFIX = 'kb-'
+
+# Bump when the layout of persisted documents changes so old stores get rebuilt
+INDEX_FORMAT_VERSION = 5
+
+# Node metadata keys that can be used to filter vector search
+FILTER_KEYS = ('home_team', 'away_team', 'competition', 'season')
+
+# FAISS factory strings for the supported index types; any other value is
+# passed to faiss.index_factory as is (e.g. "IVF1024,PQ64")
+# HNSW graphs cannot remove vectors, so an update that replaces or deletes any
+# match rebuilds the whole graph; its cost grows with history size, not the delta
+INDEX_TYPES = {
+    'flat': 'Flat',
+    'ivf': 'IVF{nlist},Flat',
+    'hnsw': 'HNSW32',
+    'ivfpq': 'IVF{nlist},PQ{pq_m}',
+    'ivfsq8': 'IVF{nlist},SQ8',
+}
+
+# Index type used for new knowledge bases (override with SOCCER_INDEX_TYPE)
+DEFAULT_INDEX_TYPE = os.environ.get('SOCCER_INDEX_TYPE', 'flat')
+
+# Default query-time tuning for approximate indexes
+DEFAULT_SEARCH_PARAMS = {'nprobe': 16, 'efSearch': 64}
+
+# Below this many training vectors, index types that need training fall back to Flat
+MIN_TRAINING_VECTORS = 1000
+
+
+class MatchFaissVectorStore(FaissVectorStore):
+    """FAISS vector store whose vector ids are match ids.
+
+    Nodes are expected to use the match_id as their node id. Keeping the FAISS
+    ids stable lets single matches be replaced or removed without rebuilding.
+
+    Node text is not stored: every match document can be rendered again from
+    the match table, so query results are materialized by the callback given
+    to `set_documents` and only a hash of each indexed document is kept, to
+    tell which matches changed.
+
+    Metadata filters on FILTER_KEYS are resolved to a set of match ids and
+    pushed down into FAISS as an ID selector, so a filtered query only scores
+    the matching vectors.
+    """
+
+    stores_text: bool = True
+
+    # (key, value) -> sorted int64 array of the match ids with that metadata value
+    _metadata_ids = PrivateAttr(default_factory=dict)
+    # match_id -> hash of the indexed document text
+    _doc_hashes = PrivateAttr(default_factory=lambda: document_hashes([], []))
+    # match ids -> nodes, in the order given
+    _render_nodes = PrivateAttr(default=None)
+
+    @property
+    def indexed_hashes(self) -> pd.Series:
+        """Hash of the indexed text of every match, indexed by int match_id (see `document_hashes`)."""
+        return self._doc_hashes
+
+    @property
+    def num_documents(self) -> int:
+        return len(self._doc_hashes)
+
+    def set_documents(self, metadata: pd.DataFrame, render_nodes: Callable[[List[int]], List[BaseNode]]):
+        """Index the filter metadata of a match table and set how result nodes are rendered.
+
+        `metadata` has an integer `match_id` column and the FILTER_KEYS columns;
+        `render_nodes` returns the nodes of the given match ids.
+        """
+        ids = metadata['match_id'].to_numpy(dtype='int64')
+        metadata_ids = {}
+        for key in FILTER_KEYS:
+            if key not in metadata:
+                continue
+            values = metadata[key]
+            for value, positions in values.groupby(values, sort=False, observed=True).indices.items():
+                metadata_ids[(key, str(value))] = np.unique(ids[positions])
+        self._metadata_ids = metadata_ids
+        self._render_nodes = render_nodes
+
+    def get_nodes(self, node_ids: Sequence[str]) -> List[BaseNode]:
+        """Nodes for the given match ids; ids the match table does not know are skipped."""
+        if not node_ids or self._render_nodes is None:
+            return []
+        return self._render_nodes([int(node_id) for node_id in node_ids])
+
+    def _forget(self, ids: List[int]):
+        self._doc_hashes = self._doc_hashes.drop(ids, errors='ignore')
+        removed = np.asarray(ids, dtype='int64')
+        for entry, entry_ids in list(self._metadata_ids.items()):
+            remaining = np.setdiff1d(entry_ids, removed, assume_unique=True)
+            if len(remaining) == len(entry_ids):
+                continue
+            if len(remaining):
+                self._metadata_ids[entry] = remaining
+            else:
+                del self._metadata_ids[entry]
+
+    def _filter_ids(self, filters: MetadataFilters) -> np.ndarray:
+        """Resolve metadata filters to a sorted array of matching ids."""
+        none = np.array([], dtype='int64')
+        matched = []
+        for f in filters.filters:
+            if isinstance(f, MetadataFilters):
+                matched.append(self._filter_ids(f))
+            elif f.operator == FilterOperator.EQ:
+                matched.append(self._metadata_ids.get((f.key, str(f.value)), none))
+            elif f.operator == FilterOperator.IN:
+                matched.append(np.unique(np.concatenate(
+                    [none] + [self._metadata_ids.get((f.key, str(value)), none) for value in f.value]
+                )))
+            else:
+                raise ValueError(f"Metadata filter operator {f.operator} not supported for Faiss.")
+        if not matched:
+            return none
+        if filters.condition == FilterCondition.OR:
+            return np.unique(np.concatenate(matched))
+        result = matched[0]
+        for ids in matched[1:]:
+            result = np.intersect1d(result, ids, assume_unique=True)
+        return result
+
+    def add(self, nodes: List[BaseNode], **add_kwargs: Any) -> List[str]:
+        """Add nodes to the FAISS index under their match ids."""
+        if not nodes:
+            return []
+        embeddings = np.array([node.get_embedding() for node in nodes], dtype='float32')
+        ids = np.array([int(node.node_id) for node in nodes], dtype='int64')
+        if not self._faiss_index.is_trained:
+            raise ValueError("FAISS index must be trained before nodes are added")
+        self._faiss_index.add_with_ids(embeddings, ids)
+        hashes = document_hashes(ids, [node.get_content() for node in nodes])
+        self._doc_hashes = pd.concat([self._doc_hashes.drop(ids, errors='ignore'), hashes])
+        return [node.node_id for node in nodes]
+
+    def train(self, nodes: Sequence[BaseNode]):
+        """Train an untrained index (IVF, PQ, SQ) on the embeddings of `nodes`."""
+        if self._faiss_index.is_trained:
+            return
+        embeddings = np.array([node.get_embedding() for node in nodes], dtype='float32')
+        print(f"Training {index_description(self._faiss_index)} index on {len(embeddings)} vectors...")
+        self._faiss_index.train(embeddings)
+    
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        """Delete the vector stored for a match id."""
+        self.delete_nodes([ref_doc_id])
+
+    def delete_nodes(self, node_ids: Optional[List[str]] = None, filters: Any = None, **delete_kwargs: Any) -> None:
+        """Delete the vectors stored for a list of match ids."""
+        if not node_ids:
+            return
+        ids = [int(i) for i in node_ids]
+        index = self._faiss_index
+        if isinstance(index, faiss.IndexIDMap2) and faiss.try_extract_index_ivf(index) is not None:
+            # Indexes persisted before IVF kept its own ids: IndexIDMap2 compacts
+            # its id map on removal while the IVF lists do not renumber, so
+            # rebuild (which also drops the wrapper) instead
+            self._rebuild_without(set(ids))
+        else:
+            try:
+                index.remove_ids(np.array(ids, dtype='int64'))
+            except RuntimeError:
+                # HNSW graphs cannot drop vectors; rebuild from the remaining ones
+                print(f"Rebuilding the {index.ntotal}-vector index to remove {len(ids)} matches")
+                self._rebuild_without(set(ids))
+        self._forget(ids)
+
+    def _rebuild_without(self, removed_ids: set):
+        index = self._faiss_index
+        inner = _inner_index(index)
+        ids = faiss.vector_to_array(index.id_map)
+        ivf = faiss.try_extract_index_ivf(inner)
+        if ivf is not None:
+            # Wrapped IVF lists hold sequential ids; map them for reconstruction
+            ivf.make_direct_map()
+        vectors = inner.reconstruct_n(0, index.ntotal)
+        keep = ~np.isin(ids, np.fromiter(removed_ids, dtype='int64', count=len(removed_ids)))
+        empty = faiss.clone_index(inner)
+        empty.reset()
+        rebuilt = _with_match_ids(empty)
+        rebuilt.add_with_ids(vectors[keep], ids[keep])
+        self._faiss_index = rebuilt
+    
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        """Query the index, restricting the search to matches passing `query.filters`."""
+        if query.filters is None:
+            return self._with_nodes(super().query(query, **kwargs))
+
+        ids = self._filter_ids(query.filters)
+        if not len(ids):
+            return VectorStoreQueryResult(nodes=[], similarities=[], ids=[])
+
+        selector = faiss.IDSelectorBatch(ids)
+        query_embedding_np = np.array(query.query_embedding, dtype='float32')[np.newaxis, :]
+        k = min(query.similarity_top_k, len(ids))
+        dists, indices = self._faiss_index.search(
+            query_embedding_np, k, params=search_parameters(self._faiss_index, selector)
+        )
+        ivf = faiss.try_extract_index_ivf(self._faiss_index)
+        if ivf is not None and (indices[0] < 0).any() and ivf.nprobe < ivf.nlist:
+            # The matching vectors sit in lists the normal nprobe skips; scan them all
+            dists, indices = self._faiss_index.search(
+                query_embedding_np, k, params=search_parameters(self._faiss_index, selector, nprobe=ivf.nlist)
+            )
+
+        similarities, node_ids = [], []
+        for dist, idx in zip(dists[0], indices[0]):
+            if idx < 0:
+                continue
+            similarities.append(dist)
+            node_ids.append(str(idx))
+        return self._with_nodes(VectorStoreQueryResult(similarities=similarities, ids=node_ids))
+
+    def _with_nodes(self, result: VectorStoreQueryResult) -> VectorStoreQueryResult:
+        """Render the result's nodes, dropping ids the match table no longer has."""
+        nodes = {node.node_id: node for node in self.get_nodes(result.ids)}
+        keep = [i for i, node_id in enumerate(result.ids) if node_id in nodes]
+        return VectorStoreQueryResult(
+            nodes=[nodes[result.ids[i]] for i in keep],
+            similarities=[result.similarities[i] for i in keep],
+            ids=[result.ids[i] for i in keep],
+        )
+
+    def save(self, store_path: str):
+        """Write the FAISS index and document hashes to a store directory."""
+        os.makedirs(store_path, exist_ok=True)
+        faiss.write_index(self._faiss_index, os.path.join(store_path, VECTOR_STORE_FNAME))
+        np.savez(os.path.join(store_path, DOCUMENTS_FNAME),
+                 ids=self._doc_hashes.index.to_numpy(dtype='int64'), hashes=self._doc_hashes.to_numpy(dtype='uint64'))
+
+    def load_documents(self, store_path: str):
+        """Read the document hashes written by `save`."""
+        with np.load(os.path.join(store_path, DOCUMENTS_FNAME)) as documents:
+            self._doc_hashes = pd.Series(documents['hashes'], index=pd.Index(documents['ids'], dtype='int64'))
+
+
+def index_factory_string(index_type: str, dimension: int, num_vectors: int = 0) -> str:
+    """Resolve an index type name to a FAISS factory string for `num_vectors` vectors.
+
+    IVF list counts follow the usual 4*sqrt(n) rule, capped so each list gets
+    at least 39 training vectors.
+    """
+    if index_type not in INDEX_TYPES:
+        return index_type
+    spec = INDEX_TYPES[index_type]
+    if '{nlist}' not in spec:
+        return spec
+    if num_vectors < MIN_TRAINING_VECTORS:
+        print(f"Only {num_vectors} vectors, using a Flat index instead of {index_type}")
+        return 'Flat'
+    nlist = max(1, min(int(4 * math.sqrt(num_vectors)), num_vectors // 39))
+    # Largest sub-quantizer count dividing the dimension, at most one per 8 dims
+    pq_m = next(m for m in (96, 64, 48, 32, 24, 16, 8, 4, 2, 1) if dimension % m == 0 and m <= max(1, dimension // 8))
+    return spec.format(nlist=nlist, pq_m=pq_m)
+
+
+def create_match_faiss_index(dimension: int, index_type: str = 'flat', num_vectors: int = 0,
+                             search_params: Optional[dict] = None):
+    """Create an empty FAISS index addressed by match id.
+
+    Approximate index types need `train` before vectors are added; pass the
+    expected number of vectors so IVF list counts can be sized.
+    """
+    spec = index_factory_string(index_type, dimension, num_vectors)
+    index = _with_match_ids(faiss.index_factory(dimension, spec))
+    set_search_params(index, {**DEFAULT_SEARCH_PARAMS, **(search_params or {})})
+    return index
+
+
+def document_hashes(ids, texts) -> pd.Series:
+    """Document text hashes indexed by match id."""
+    hashes = pd.util.hash_array(np.asarray(texts, dtype=object)) if len(texts) else np.array([], dtype='uint64')
+    return pd.Series(hashes, index=pd.Index(np.asarray(ids, dtype='int64')), dtype='uint64')
+
+
+def _with_match_ids(index):
+    """Make an empty index store vectors under arbitrary int64 ids.
+
+    IVF lists store ids themselves and do not renumber on removal, so they get
+    a hashtable direct map (for remove_ids and reconstruct) instead of an
+    IndexIDMap2, whose id map would fall out of sync with them. Other indexes
+    are wrapped in an IndexIDMap2.
+    """
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+        return index
+    return faiss.IndexIDMap2(index)
+
+
+def index_description(faiss_index) -> str:
+    """Short name of the index wrapped by an ID map, e.g. 'IndexIVFFlat'."""
+    return type(_inner_index(faiss_index)).__name__
+
+
+def _inner_index(faiss_index):
+    """The index wrapped by an IndexIDMap2, downcast to its concrete type."""
+    return faiss.downcast_index(faiss_index.index) if isinstance(faiss_index, faiss.IndexIDMap2) else faiss_index
+
+
+def get_search_params(faiss_index) -> dict:
+    """Query-time tuning parameters currently set on an index."""
+    params = {}
+    ivf = faiss.try_extract_index_ivf(faiss_index)
+    if ivf is not None:
+        params['nprobe'] = int(ivf.nprobe)
+    inner = _inner_index(faiss_index)
+    if hasattr(inner, 'hnsw'):
+        params['efSearch'] = int(inner.hnsw.efSearch)
+    return params
+
+
+def set_search_params(faiss_index, params: dict):
+    """Apply `nprobe` / `efSearch` to an index; parameters it does not use are ignored."""
+    ivf = faiss.try_extract_index_ivf(faiss_index)
+    if ivf is not None and params.get('nprobe'):
+        ivf.nprobe = min(int(params['nprobe']), ivf.nlist)
+    inner = _inner_index(faiss_index)
+    if hasattr(inner, 'hnsw') and params.get('efSearch'):
+        inner.hnsw.efSearch = int(params['efSearch'])
+
+
+def search_parameters(faiss_index, selector, nprobe: Optional[int] = None):
+    """SearchParameters of the type the wrapped index expects, restricted to `selector`."""
+    ivf = faiss.try_extract_index_ivf(faiss_index)
+    if ivf is not None:
+        return faiss.SearchParametersIVF(sel=selector, nprobe=nprobe or ivf.nprobe)
+    inner = _inner_index(faiss_index)
+    if hasattr(inner, 'hnsw'):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=inner.hnsw.efSearch)
+    return faiss.SearchParameters(sel=selector)
+
+
+def knowledge_base_key(data_path: str, embed_model_name: str) -> str:
+    """Hash the CSV contents together with the embedding model and index format."""
+    digest = hashlib.sha256()
+    with open(data_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    digest.update(f"|{embed_model_name}|v{INDEX_FORMAT_VERSION}".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def dataframe_key(df: pd.DataFrame, embed_model_name: str) -> str:
+    """Hash an in-memory match table the same way knowledge_base_key hashes a CSV."""
+    digest = hashlib.sha256(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    digest.update(f"|{embed_model_name}|v{INDEX_FORMAT_VERSION}".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def read_manifest(persist_dir: str) -> Optional[dict]:
+    """Return the manifest of a persisted knowledge base, or None if there is none."""
+    manifest_path = os.path.join(persist_dir, MANIFEST_FNAME)
+    if not os.path.exists(manifest_path):
+        return None
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def store_dir(persist_dir: str, manifest: dict) -> Optional[str]:
+    """Subdirectory holding the index files a manifest describes."""
+    store = manifest.get('store')
+    return os.path.join(persist_dir, store) if store else None
+
+
+def read_faiss_index(store_path: str, mmap: bool = True):
+    """Read a persisted FAISS index from a store directory, memory-mapping it when requested.
+
+    A memory-mapped index is read-only; pass mmap=False to get an index that
+    can still be added to.
+    """
+    path = os.path.join(store_path, VECTOR_STORE_FNAME)
+    if mmap:
+        io_flags = getattr(faiss, 'IO_FLAG_MMAP_IFC', faiss.IO_FLAG_MMAP)
+        try:
+            return faiss.read_index(path, io_flags)
+        except RuntimeError as e:
+            print(f"Memory-mapped read failed, loading index into memory: {e}")
+    return faiss.read_index(path)
+
+
+def load_knowledge_base(persist_dir: str, key: str, mmap: bool = True,
+                        index_type: str = 'flat') -> Optional[VectorStoreIndex]:
+    """Load a persisted index if its manifest matches `key` and `index_type`, otherwise return None."""
+    manifest = read_manifest(persist_dir)
+    if (manifest is None
+            or manifest.get('key') != key
+            or manifest.get('index_type', 'flat') != index_type):
+        return None
+    return _load_index(store_dir(persist_dir, manifest), mmap, manifest.get('search_params'))
+
+
+def load_compatible_knowledge_base(persist_dir: str, embed_model_name: str,
+                                   index_type: str = 'flat') -> Optional[VectorStoreIndex]:
+    """Load a writable persisted index built with the same embedding model and index type.
+
+    The data it was built from may differ; callers are expected to bring it up
+    to date with an incremental update.
+    """
+    manifest = read_manifest(persist_dir)
+    if (manifest is None
+            or manifest.get('embed_model') != embed_model_name
+            or manifest.get('format_version') != INDEX_FORMAT_VERSION
+            or manifest.get('index_type', 'flat') != index_type):
+        return None
+    return _load_index(store_dir(persist_dir, manifest), mmap=False, search_params=manifest.get('search_params'))
+
+
+def _load_index(store_path: Optional[str], mmap: bool,
+                search_params: Optional[dict] = None) -> Optional[VectorStoreIndex]:
+    if store_path is None:
+        return None
+    try:
+        faiss_index = read_faiss_index(store_path, mmap=mmap)
+        set_search_params(faiss_index, search_params or {})
+        vector_store = MatchFaissVectorStore(faiss_index=faiss_index)
+        vector_store.load_documents(store_path)
+        return VectorStoreIndex.from_vector_store(vector_store)
+    except Exception as e:
+        print(f"Error loading persisted knowledge base: {e}")
+        return None
+
+
+def persist_knowledge_base(index: VectorStoreIndex, persist_dir: str, key: str, num_documents: int,
+                           embed_model_name: str, index_type: str = 'flat'):
+    """Write the FAISS index, document hashes and a manifest describing them to `persist_dir`.
+
+    Files are written to a new subdirectory and the manifest is then replaced
+    atomically to point at it, so processes that have the previous index
+    memory-mapped keep reading intact files. The store before the previous
+    one is deleted. The manifest records the index type and its query-time
+    tuning so a reload searches the same way.
+    """
+    os.makedirs(persist_dir, exist_ok=True)
+    previous = read_manifest(persist_dir) or {}
+    store = f"{STORE_DIR_PREFIX}{time.time_ns():x}-{os.getpid()}"
+    index.vector_store.save(os.path.join(persist_dir, store))
+
+    manifest = {
+        'key': key,
+        'num_documents': num_documents,
+        'embed_model': embed_model_name,
+        'format_version': INDEX_FORMAT_VERSION,
+        'index_type': index_type,
+        'index': index_description(index.vector_store.client),
+        'search_params': get_search_params(index.vector_store.client),
+        'store': store,
+        # Kept until the next persist for processes still loading it
+        'previous_store': previous.get('store'),
+    }
+    tmp_path = os.path.join(persist_dir, f"{MANIFEST_FNAME}.{os.getpid()}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(persist_dir, MANIFEST_FNAME))
+
+    # Unlinking files another process has memory-mapped is safe; their pages stay valid
+    stale = previous.get('previous_store')
+    if stale and stale.startswith(STORE_DIR_PREFIX) and stale not in (store, previous.get('store')):
+        shutil.rmtree(os.path.join(persist_dir, stale), ignore_errors=True)
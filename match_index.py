@@ -0,0 +1,174 @@
+import difflib
+import hashlib
+import re
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+_MISSING_DATE = np.iinfo('int64').max
+
+
+class MatchIndex:
+    """In-memory index of matches by team and by team pair, ordered by kickoff time.
+
+    Every team and team pair maps to an array of row positions sorted by
+    `utcDate`, so head-to-head and recent-form lookups are a dictionary access
+    plus a binary search instead of a scan over the whole table.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        dates = pd.to_datetime(df['utcDate'], errors='coerce', utc=True)
+        dates_ns = dates.values.astype('datetime64[ns]').astype('int64')
+        # Matches without a date sort last and never count as "before" anything
+        dates_ns = np.where(dates.isna().values, _MISSING_DATE, dates_ns)
+        order = np.argsort(dates_ns, kind='stable')
+
+        self.df = df.iloc[order].reset_index(drop=True)
+        self._dates = dates_ns[order]
+        played = self.df['winner'].notna().values
+
+        self._team_positions = self._group_by_team(np.ones(len(self.df), dtype=bool))
+        self._team_played_positions = self._group_by_team(played)
+        self._pair_positions = self._group_by_pair(np.ones(len(self.df), dtype=bool))
+        self._pair_played_positions = self._group_by_pair(played)
+        self._ids = pd.Index(pd.to_numeric(self.df['match_id'], errors='coerce'))
+        self._team_versions = {}
+
+    def _group_by_team(self, mask: np.ndarray) -> Dict[str, np.ndarray]:
+        positions = np.flatnonzero(mask)
+        teams = pd.concat([
+            self.df['home_team'].iloc[positions],
+            self.df['away_team'].iloc[positions]
+        ], ignore_index=True)
+        all_positions = np.concatenate([positions, positions])
+        return {
+            team: np.sort(all_positions[idx])
+            for team, idx in teams.groupby(teams, sort=False, observed=True).indices.items()
+        }
+
+    def _group_by_pair(self, mask: np.ndarray) -> Dict[Tuple[str, str], np.ndarray]:
+        positions = np.flatnonzero(mask)
+        home = self.df['home_team'].iloc[positions].astype(str).values
+        away = self.df['away_team'].iloc[positions].astype(str).values
+        first = np.where(home <= away, home, away)
+        second = np.where(home <= away, away, home)
+        groups = pd.DataFrame({'first': first, 'second': second}).groupby(['first', 'second'], sort=False).indices
+        return {pair: positions[idx] for pair, idx in groups.items()}
+
+    def _latest(self, positions: Optional[np.ndarray], limit: int, before=None) -> pd.DataFrame:
+        """Return up to `limit` rows from `positions` (date-sorted), most recent first."""
+        if positions is None or len(positions) == 0:
+            return self.df.iloc[0:0]
+        if before is not None:
+            cutoff = pd.Timestamp(before)
+            if cutoff.tzinfo is None:
+                cutoff = cutoff.tz_localize('UTC')
+            end = np.searchsorted(self._dates[positions], cutoff.value, side='left')
+            positions = positions[:end]
+        return self.df.iloc[positions[-limit:][::-1]] if limit > 0 else self.df.iloc[0:0]
+
+    def head_to_head(self, team_a: str, team_b: str, limit: int = 3, before=None,
+                     played_only: bool = True) -> pd.DataFrame:
+        """Most recent matches between two teams, regardless of venue."""
+        pair = (team_a, team_b) if team_a <= team_b else (team_b, team_a)
+        pairs = self._pair_played_positions if played_only else self._pair_positions
+        return self._latest(pairs.get(pair), limit, before)
+
+    def recent_matches(self, team: str, limit: int = 5, before=None,
+                       played_only: bool = True) -> pd.DataFrame:
+        """Most recent matches involving `team`, home or away."""
+        teams = self._team_played_positions if played_only else self._team_positions
+        return self._latest(teams.get(team), limit, before)
+
+    def team_version(self, team: str) -> str:
+        """Hash of a team's played results; changes whenever a result of theirs is added or corrected."""
+        version = self._team_versions.get(team)
+        if version is None:
+            played = self.df.iloc[self._team_played_positions.get(team, [])]
+            rows = pd.util.hash_pandas_object(played[['match_id', 'home_score', 'away_score']], index=False)
+            version = self._team_versions[team] = hashlib.sha256(rows.values.tobytes()).hexdigest()[:16]
+        return version
+
+    def by_ids(self, match_ids: List[str]) -> pd.DataFrame:
+        """Rows for the given match ids in the order given; unknown ids are skipped."""
+        positions = self._ids.get_indexer([int(match_id) for match_id in match_ids])
+        return self.df.iloc[positions[positions >= 0]]
+
+
+# Club-type abbreviations and filler words that do not identify a team on their own
+_TEAM_NAME_NOISE = {
+    'fc', 'cf', 'afc', 'ac', 'acf', 'as', 'us', 'sc', 'ssc', 'sk', 'fk', 'cd', 'ud', 'rc', 'rcd',
+    'sv', 'vfb', 'vfl', 'tsg', 'bsc', 'ogc', 'pae', 'sfp', 'gnk', 'kv', 'hsc', 'osc', 'sco', 'bc',
+    'cfc', 'aj', 'fsv', 'calcio', 'club', 'de', 'e', 'the',
+}
+
+# Common short forms expanded before matching user-supplied text against team names
+_TEAM_NAME_ABBREVIATIONS = {
+    'man': 'manchester', 'utd': 'united', 'psg': 'paris saint germain', 'spurs': 'tottenham hotspur',
+    'atleti': 'atletico', 'barca': 'barcelona', 'inter': 'internazionale', 'gladbach': 'monchengladbach',
+}
+
+
+def normalize_name(text: str) -> str:
+    """Lowercase, strip accents and punctuation, and collapse whitespace."""
+    text = unicodedata.normalize('NFKD', str(text))
+    text = ''.join(c for c in text if not unicodedata.combining(c)).lower()
+    return ' '.join(re.sub(r"[^a-z0-9]+", ' ', text).split())
+
+
+def _expand_abbreviations(text: str) -> str:
+    """Normalize `text` and expand short forms such as "man utd" to "manchester united"."""
+    return ' '.join(_TEAM_NAME_ABBREVIATIONS.get(word, word) for word in normalize_name(text).split())
+
+
+class TeamNameResolver:
+    """Map free-text team mentions ("Bayern", "man city fc", "Atletico") to dataset team names."""
+
+    def __init__(self, teams):
+        self.teams = sorted({str(t) for t in teams if isinstance(t, str)}, key=str.lower)
+        aliases = {}
+        token_teams = {}
+        for team in self.teams:
+            full = normalize_name(team)
+            core = ' '.join(t for t in full.split() if t not in _TEAM_NAME_NOISE and not t.isdigit())
+            for alias in (full, core):
+                if alias:
+                    aliases.setdefault(alias, team)
+            for token in set(core.split()):
+                token_teams.setdefault(token, set()).add(team)
+        # Single distinctive words ("arsenal", "bayern") are aliases when only one team uses them
+        for token, owners in token_teams.items():
+            if len(owners) == 1 and len(token) >= 4:
+                aliases.setdefault(token, next(iter(owners)))
+        self._aliases = aliases
+        # Longest aliases first so "manchester city" wins over shorter overlaps
+        self._pattern = re.compile(
+            r"\b(" + "|".join(re.escape(a) for a in sorted(aliases, key=len, reverse=True)) + r")\b"
+        ) if aliases else None
+
+    def find_teams(self, text: str) -> List[str]:
+        """Teams mentioned in `text`, in order of first mention."""
+        if self._pattern is None:
+            return []
+        found = []
+        for match in self._pattern.finditer(_expand_abbreviations(text)):
+            team = self._aliases[match.group(1)]
+            if team not in found:
+                found.append(team)
+        return found
+
+    def resolve(self, name: str) -> Optional[str]:
+        """Best dataset team name for a user-supplied name, or None if nothing is close."""
+        if name in self.teams:
+            return name
+        normalized = _expand_abbreviations(name)
+        if normalized in self._aliases:
+            return self._aliases[normalized]
+        mentioned = self.find_teams(normalized)
+        if mentioned:
+            return mentioned[0]
+        close = difflib.get_close_matches(normalized, list(self._aliases), n=1, cutoff=0.75)
+        return self._aliases[close[0]] if close else None
@@ -0,0 +1,163 @@
+import hashlib
+import os
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ImportError:
+    # Without pyarrow CSVs are still compacted, just not cached
+    pa = None
+
+
+# Compact table cached next to the persisted index, keyed by the source file's contents
+MATCH_STORE_FNAME = 'matches.arrow'
+
+# Bump when the column layout of the compact table changes
+MATCH_STORE_VERSION = 1
+
+# Repeated strings stored as integer-coded categoricals
+CATEGORY_COLUMNS = ('status', 'stage', 'winner', 'referee', 'source_file')
+
+# Nullable small-int columns (scores are missing for unplayed matches)
+SMALL_INT_COLUMNS = {'season': 'Int16', 'matchday': 'Int16', 'home_score': 'Int8', 'away_score': 'Int8'}
+
+# Rows parsed per chunk when reading a CSV, bounding the raw object-dtype frame held at once
+CSV_CHUNK_SIZE = 50_000
+
+_STORE_KEY = b'soccer_match_store_key'
+
+def compact_matches(df: pd.DataFrame) -> pd.DataFrame:
+    """Convert a raw match table to compact dtypes.
+
+    Teams share one categorical dictionary across home_team and away_team, so
+    their codes are comparable. Other repeated strings become categoricals,
+    scores and matchdays nullable small ints, and `utcDate` a UTC datetime
+    (int64 nanoseconds). Columns already in compact form are left as is.
+    """
+    df = df.copy()
+    if 'match_id' in df:
+        df['match_id'] = pd.to_numeric(df['match_id'], errors='coerce').astype('Int64')
+    if 'utcDate' in df and not isinstance(df['utcDate'].dtype, pd.DatetimeTZDtype):
+        df['utcDate'] = pd.to_datetime(df['utcDate'], errors='coerce', utc=True)
+    for column, dtype in SMALL_INT_COLUMNS.items():
+        if column in df:
+            df[column] = pd.to_numeric(df[column], errors='coerce').round().astype(dtype)
+
+    team_columns = [c for c in ('home_team', 'away_team') if c in df]
+    if team_columns:
+        teams = pd.concat([df[c].astype(object) for c in team_columns]).dropna().unique()
+        team_dtype = pd.CategoricalDtype(sorted(teams, key=str))
+        for column in team_columns:
+            df[column] = df[column].astype(object).astype(team_dtype)
+    for column in CATEGORY_COLUMNS:
+        if column in df:
+            df[column] = df[column].astype(object).astype('category')
+    return df
+
+
+def format_utc_dates(dates: pd.Series) -> pd.Series:
+    """Render kickoff times as '2023-08-11T19:00:00Z' strings, empty when missing."""
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        return dates.fillna('').astype(str)
+    # datetime_as_string is vectorized in C, unlike Series.dt.strftime
+    values = dates.dt.tz_convert('UTC').dt.tz_localize(None).values if isinstance(dates.dtype, pd.DatetimeTZDtype) else dates.values
+    text = np.char.add(np.datetime_as_string(values, unit='s'), 'Z').astype(object)
+    return pd.Series(text, index=dates.index).where(dates.notna(), '')
+
+
+def read_matches_csv(path: str, chunksize: int = CSV_CHUNK_SIZE) -> pd.DataFrame:
+    """Parse a match CSV chunk by chunk, compacting each chunk before the next is read.
+
+    Each chunk's categoricals only know the values it contains, so their
+    categories are unioned (teams across both team columns) before the
+    chunks are concatenated.
+    """
+    chunks = [compact_matches(chunk) for chunk in pd.read_csv(path, chunksize=chunksize)]
+    if len(chunks) <= 1:
+        return chunks[0] if chunks else compact_matches(pd.read_csv(path))
+
+    for group in (('home_team', 'away_team'),) + tuple((column,) for column in CATEGORY_COLUMNS):
+        group = [column for column in group if column in chunks[0]]
+        if not group:
+            continue
+        categories = pd.api.types.union_categoricals(
+            [chunk[column] for chunk in chunks for column in group], ignore_order=True
+        ).categories
+        dtype = pd.CategoricalDtype(sorted(categories, key=str))
+        for chunk in chunks:
+            for column in group:
+                chunk[column] = chunk[column].astype(dtype)
+    return pd.concat(chunks, ignore_index=True)
+
+
+def source_key(path: str) -> str:
+    """Hash a source file's contents together with the store layout version."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    digest.update(f"|store-v{MATCH_STORE_VERSION}".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def write_match_store(df: pd.DataFrame, path: str, key: Optional[str] = None):
+    """Write a compact match table as Parquet (.parquet) or uncompressed Arrow IPC."""
+    if pa is None:
+        raise ImportError("pyarrow is required to write Parquet/Arrow match stores")
+    table = pa.Table.from_pandas(compact_matches(df), preserve_index=False)
+    if key is not None:
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), _STORE_KEY: key.encode('utf-8')})
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + '.tmp'
+    if path.endswith('.parquet'):
+        pq.write_table(table, tmp_path)
+    else:
+        # Uncompressed so reading it is a copy rather than a decode
+        feather.write_feather(table, tmp_path, compression='uncompressed')
+    os.replace(tmp_path, path)
+
+
+def _read_store_key(path: str) -> Optional[str]:
+    try:
+        with pa.memory_map(path) as source:
+            metadata = pa.ipc.open_file(source).schema.metadata or {}
+    except (OSError, pa.ArrowInvalid):
+        return None
+    key = metadata.get(_STORE_KEY)
+    return key.decode('utf-8') if key else None
+
+
+def read_match_store(path: str) -> pd.DataFrame:
+    """Read a Parquet or Arrow match table into an in-memory compact DataFrame."""
+    if pa is None:
+        raise ImportError("pyarrow is required to read Parquet/Arrow match stores")
+    if path.endswith('.parquet'):
+        return compact_matches(pd.read_parquet(path, memory_map=True))
+    return feather.read_table(path, memory_map=True).to_pandas()
+
+
+def load_matches(data_path: str, cache_dir: Optional[str] = None) -> pd.DataFrame:
+    """Load a match table from CSV, Parquet or Arrow as a compact DataFrame.
+
+    CSVs are parsed once and cached as an Arrow file in `cache_dir`; later
+    loads of the same CSV contents read the cached table instead.
+    """
+    if not data_path.endswith('.csv'):
+        return read_match_store(data_path)
+
+    cache_path = os.path.join(cache_dir, MATCH_STORE_FNAME) if cache_dir and pa is not None else None
+    key = source_key(data_path) if cache_path else None
+    if cache_path and os.path.exists(cache_path) and _read_store_key(cache_path) == key:
+        return read_match_store(cache_path)
+
+    df = read_matches_csv(data_path)
+    if cache_path:
+        write_match_store(df, cache_path, key)
+    return df
@@ -0,0 +1,157 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+
+# Append every span and error as a JSON line to this file (set SOCCER_METRICS_LOG to enable)
+DEFAULT_LOG_PATH = os.environ.get('SOCCER_METRICS_LOG')
+
+# Recent durations kept per span for percentile reporting
+RECENT_WINDOW = 1000
+
+METRIC_PREFIX = 'soccer_'
+
+
+def _label_key(labels: dict) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+class Metrics:
+    """Thread-safe timed spans and counters for the prediction pipeline.
+
+    Spans keep running totals plus a window of recent durations for
+    percentiles. Everything can be exported as Prometheus text or a JSON
+    snapshot, and spans are optionally logged as JSON lines.
+    """
+
+    def __init__(self, log_path: Optional[str] = DEFAULT_LOG_PATH, window: int = RECENT_WINDOW):
+        self.log_path = log_path
+        self._lock = threading.Lock()
+        self._recent = defaultdict(lambda: deque(maxlen=window))
+        self._span_totals = defaultdict(lambda: [0, 0.0])
+        self._counters = defaultdict(float)
+
+    @contextmanager
+    def span(self, name: str, **labels):
+        """Time the enclosed block as span `name`; failures are recorded with an error label."""
+        start = time.perf_counter()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start, error=error, **labels)
+
+    def observe(self, name: str, seconds: float, error: Optional[str] = None, **labels):
+        """Record a duration for span `name` measured elsewhere."""
+        with self._lock:
+            self._recent[name].append(seconds)
+            totals = self._span_totals[name]
+            totals[0] += 1
+            totals[1] += seconds
+            if error:
+                self._counters[('errors_total', _label_key({'span': name, 'error': error}))] += 1
+        self._log({'span': name, 'seconds': seconds, 'error': error, **labels})
+
+    def increment(self, name: str, value: float = 1, **labels):
+        with self._lock:
+            self._counters[(name, _label_key(labels))] += value
+
+    def record_error(self, name: str, error: BaseException, **labels):
+        """Count an exception that was handled (e.g. by a fallback) instead of raised."""
+        self.increment('errors_total', span=name, error=type(error).__name__)
+        self._log({'span': name, 'error': type(error).__name__, 'message': str(error), **labels})
+
+    def percentiles(self, name: str) -> Dict[str, float]:
+        """p50/p95/p99 of the recent durations of span `name`, in milliseconds."""
+        with self._lock:
+            values = np.array(self._recent.get(name, ()), dtype='float64') * 1000
+        if values.size == 0:
+            return {}
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        return {'count': int(values.size), 'p50': float(p50), 'p95': float(p95), 'p99': float(p99)}
+
+    def snapshot(self) -> dict:
+        """All counters and span statistics as plain data."""
+        with self._lock:
+            names = list(self._recent)
+            totals = {name: tuple(value) for name, value in self._span_totals.items()}
+            counters = dict(self._counters)
+        return {
+            'spans': {
+                name: {'count': totals[name][0], 'seconds_total': totals[name][1], **self.percentiles(name)}
+                for name in names
+            },
+            'counters': [
+                {'name': name, 'labels': dict(labels), 'value': value}
+                for (name, labels), value in sorted(counters.items())
+            ],
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition: counters plus a summary per span."""
+        snapshot = self.snapshot()
+        lines = []
+        for counter in snapshot['counters']:
+            labels = ",".join(f'{key}="{value}"' for key, value in counter['labels'].items())
+            labels = f"{{{labels}}}" if labels else ""
+            lines.append(f"{METRIC_PREFIX}{counter['name']}{labels} {counter['value']:g}")
+        if snapshot['spans']:
+            lines.append(f"# TYPE {METRIC_PREFIX}span_seconds summary")
+        for name, span in snapshot['spans'].items():
+            for quantile in ('p50', 'p95', 'p99'):
+                if quantile in span:
+                    lines.append(f'{METRIC_PREFIX}span_seconds{{span="{name}",quantile="0.{quantile[1:]}"}} '
+                                 f'{span[quantile] / 1000:.6f}')
+            lines.append(f'{METRIC_PREFIX}span_seconds_sum{{span="{name}"}} {span["seconds_total"]:.6f}')
+            lines.append(f'{METRIC_PREFIX}span_seconds_count{{span="{name}"}} {span["count"]}')
+        return "\n".join(lines) + "\n"
+
+    def _log(self, record: dict):
+        if not self.log_path:
+            return
+        record = {'time': time.time(), **{key: value for key, value in record.items() if value is not None}}
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+
+def serve_metrics(metrics: Metrics, port: int, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    """Serve /metrics (Prometheus text) and /metrics.json from a background thread."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/metrics':
+                body, content_type = metrics.to_prometheus(), 'text/plain; version=0.0.4'
+            elif self.path == '/metrics.json':
+                body, content_type = metrics.to_json(), 'application/json'
+            else:
+                self.send_error(404)
+                return
+            data = body.encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Serving metrics on http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,116 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Optional
+
+
+# Optional on-disk tier for cached predictions (set SOCCER_PREDICTION_CACHE to enable)
+DEFAULT_DISK_PATH = os.environ.get('SOCCER_PREDICTION_CACHE')
+
+
+class PredictionCache:
+    """Two-tier cache of prediction results: an in-memory LRU plus an optional SQLite file.
+
+    Entries expire after `ttl_seconds`. Every entry records the knowledge-base
+    version it was computed against, and `invalidate(kb_version)` drops all
+    entries from other versions once the data changes.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 6 * 3600,
+                 disk_path: Optional[str] = DEFAULT_DISK_PATH):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_path = disk_path
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if disk_path:
+            disk_dir = os.path.dirname(disk_path)
+            if disk_dir:
+                os.makedirs(disk_dir, exist_ok=True)
+            with self._connect() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS predictions ("
+                    "key TEXT PRIMARY KEY, kb_version TEXT, created_at REAL, value TEXT)"
+                )
+
+    @staticmethod
+    def make_key(home_team: str, away_team: str, competition: Optional[str],
+                 prompt_version: str, kb_version: Optional[str]) -> str:
+        return json.dumps([home_team, away_team, competition, prompt_version, kb_version])
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.disk_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created_at, value = entry
+                if now - created_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+        if self.disk_path:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT created_at, value FROM predictions WHERE key = ?", (key,)
+                ).fetchone()
+            if row is not None and now - row[0] <= self.ttl_seconds:
+                with self._lock:
+                    self._store(key, row[0], row[1])
+                    self.hits += 1
+                return row[1]
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, value: str, kb_version: Optional[str] = None):
+        created_at = time.time()
+        with self._lock:
+            self._store(key, created_at, value)
+        if self.disk_path:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO predictions (key, kb_version, created_at, value) VALUES (?, ?, ?, ?)",
+                    (key, kb_version, created_at, value)
+                )
+
+    def _store(self, key: str, created_at: float, value: str):
+        self._entries[key] = (created_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, kb_version: Optional[str] = None):
+        """Drop every entry not computed against `kb_version` (all entries if None)."""
+        with self._lock:
+            for key in list(self._entries):
+                if kb_version is None or json.loads(key)[4] != kb_version:
+                    del self._entries[key]
+        if self.disk_path:
+            with self._connect() as conn:
+                conn.execute(
+                    "DELETE FROM predictions WHERE kb_version IS NOT ? OR ? IS NULL",
+                    (kb_version, kb_version)
+                )
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
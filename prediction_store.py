@@ -0,0 +1,105 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+# Predictions precomputed for upcoming fixtures (override with SOCCER_PRECOMPUTED_PATH)
+DEFAULT_STORE_PATH = os.environ.get(
+    'SOCCER_PRECOMPUTED_PATH', os.path.join('storage', 'precomputed_predictions.sqlite')
+)
+
+
+class PrecomputedPredictions:
+    """SQLite table of predictions materialized for upcoming fixtures.
+
+    Each row records the data version of the fixture it was computed against
+    (see `SoccerMatchPredictor.fixture_data_version`), so a stored prediction
+    is only served while neither team's results have changed. With
+    `path=None` the store is disabled and holds nothing.
+    """
+
+    def __init__(self, path: Optional[str] = DEFAULT_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        if path:
+            store_dir = os.path.dirname(path)
+            if store_dir:
+                os.makedirs(store_dir, exist_ok=True)
+            with self._connect() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS fixtures ("
+                    "home_team TEXT, away_team TEXT, competition TEXT, match_id TEXT, utc_date TEXT, "
+                    "data_version TEXT, computed_at REAL, prediction TEXT, "
+                    "PRIMARY KEY (home_team, away_team, competition))"
+                )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, home_team: str, away_team: str, competition: Optional[str],
+            data_version: str) -> Optional[str]:
+        """Stored prediction if it was computed against `data_version`.
+
+        Without a competition the pair's next fixture in any competition is used.
+        """
+        if not self.path:
+            return None
+        query = ("SELECT prediction FROM fixtures WHERE home_team = ? AND away_team = ? AND data_version = ?")
+        params = [home_team, away_team, data_version]
+        if competition:
+            query += " AND competition = ?"
+            params.append(competition)
+        with self._connect() as conn:
+            row = conn.execute(query + " ORDER BY utc_date LIMIT 1", params).fetchone()
+        return row[0] if row else None
+
+    def versions(self) -> Dict[Tuple[str, str, str], str]:
+        """Data version of every stored fixture, keyed by (home_team, away_team, competition or '')."""
+        if not self.path:
+            return {}
+        with self._connect() as conn:
+            rows = conn.execute("SELECT home_team, away_team, competition, data_version FROM fixtures").fetchall()
+        return {(home, away, competition): version for home, away, competition, version in rows}
+
+    def put_many(self, rows: Iterable[dict]):
+        """Insert or replace fixtures given as dicts with the table's columns (computed_at is set here)."""
+        if not self.path:
+            return
+        computed_at = time.time()
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO fixtures (home_team, away_team, competition, match_id, utc_date, "
+                "data_version, computed_at, prediction) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(row['home_team'], row['away_team'], row['competition'] or '', row.get('match_id'), row.get('utc_date'),
+                  row['data_version'], computed_at, row['prediction']) for row in rows]
+            )
+
+    def retain(self, keys: Iterable[Tuple[str, str, str]]) -> int:
+        """Delete fixtures not in `keys`, e.g. ones that have since been played. Returns rows removed."""
+        if not self.path:
+            return 0
+        keep = set(keys)
+        stale = [key for key in self.versions() if key not in keep]
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                "DELETE FROM fixtures WHERE home_team = ? AND away_team = ? AND competition = ?", stale
+            )
+        return len(stale)
+
+    def upcoming(self) -> List[dict]:
+        """All stored fixtures in kickoff order."""
+        if not self.path:
+            return []
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute("SELECT * FROM fixtures ORDER BY utc_date").fetchall()
+        return [dict(row) for row in rows]
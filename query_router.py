@@ -0,0 +1,225 @@
+import re
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from match_index import TeamNameResolver, normalize_name
+
+
+_YEAR = re.compile(r"\b(20\d{2})(?:\s*[/-]\s*(\d{2}|20\d{2}))?\b")
+_HOME = re.compile(r"(?<!away from )\bhome\b")
+_AWAY = re.compile(r"\b(away|on the road)\b")
+
+_REFEREE = re.compile(r"\breferee(?:d|s|ing)?\b|\bofficiated\b")
+_CONCEDED = re.compile(r"\b(conceded?|concede|let in|allowed)\b|\bgoals? against\b")
+_GOALS = re.compile(r"\bgoals?\b|\bscored?\b")
+_WINS = re.compile(r"\b(wins?|won)\b")
+_DRAWS = re.compile(r"\b(draws?|drew|drawn)\b")
+_LOSSES = re.compile(r"\b(loss|losses|lost|defeats?)\b")
+_RECORD = re.compile(r"\brecord\b")
+_COUNT = re.compile(r"\b(how many|number of|count)\b")
+_PLAYED = re.compile(r"\b(games?|matches|played)\b")
+_LAST = re.compile(r"\b(last|latest|most recent|previous) (?:match|game|result|fixture)")
+_TOTAL = re.compile(r"\b(how many|number of|count|total|tally)\b")
+_MOST = re.compile(r"\bmost\b")
+_WHICH = re.compile(r"\b(who|whom|which)\b")
+
+# Wording the table cannot answer: players, explanations, comparisons and
+# time windows other than an explicit year or season
+_PLAYER = re.compile(
+    r"\b(players?|scorers?|goalscorers?|strikers?|forwards?|midfielders?|defenders?|goalkeepers?|keepers?"
+    r"|assists?|hat ?tricks?|squad|lineups?|manager|coach)\b"
+)
+_WHY = re.compile(r"\b(why|how come|explain|reasons?|because)\b")
+_COMPARISON = re.compile(r"\b(better|worse|than|compared?|comparison|more often|less often|versus)\b")
+_UNSUPPORTED_SCOPE = re.compile(
+    r"\b(this|last|next|current|previous|past) (season|year|month|week)\b|\blast \d+\b"
+    r"|\b(since|before|after|until|between|recent|recently|lately|form|streak|half|halftime|penalt(?:y|ies)"
+    r"|cards?|minutes?|margin|clean sheets?|nil)\b|\bby (?:at least|\d+|one|two|three|four|five) goals?\b"
+)
+# Scorelines ("3-0") are read from the raw question; normalizing drops the dash
+_SCORELINE = re.compile(r"\b\d{1,2}\s*[-:]\s*\d{1,2}\b")
+
+
+class QueryRouter:
+    """Answer factual questions about the match table without calling the LLM.
+
+    Questions are matched against a handful of patterns (goal totals, win/draw/
+    loss records, referee counts, last results) and answered with pandas over a
+    per-team table of finished matches. Anything that does not fit a pattern
+    returns None so the caller can fall back to retrieval plus LLM, as does
+    any question with wording the table cannot honour (players, "why",
+    comparisons, relative time windows, a named referee).
+    """
+
+    def __init__(self, df: pd.DataFrame, resolver: Optional[TeamNameResolver] = None):
+        home_goals = pd.to_numeric(df['home_score'], errors='coerce')
+        away_goals = pd.to_numeric(df['away_score'], errors='coerce')
+        played = df['winner'].notna() & home_goals.notna() & away_goals.notna()
+        played &= df['home_team'].notna() & df['away_team'].notna()
+        matches = df[played]
+        dates = pd.to_datetime(matches['utcDate'], errors='coerce', utc=True)
+        competition = matches['competition'] if 'competition' in matches else pd.Series('', index=matches.index)
+        # Teams, competitions and referees stay categorical so the per-team table is
+        # integer codes; home_team and away_team share one dictionary after compact_matches
+        teams = pd.api.types.union_categoricals(
+            [matches['home_team'].astype('category'), matches['away_team'].astype('category')]
+        ).categories
+        team_dtype = pd.CategoricalDtype(teams)
+
+        def side(is_home: bool) -> pd.DataFrame:
+            goals_for, goals_against = (home_goals, away_goals) if is_home else (away_goals, home_goals)
+            return pd.DataFrame({
+                'team': matches['home_team' if is_home else 'away_team'].astype(team_dtype),
+                'opponent': matches['away_team' if is_home else 'home_team'].astype(team_dtype),
+                'is_home': is_home,
+                'goals_for': goals_for[played].astype('int16'),
+                'goals_against': goals_against[played].astype('int16'),
+                'date': dates,
+                'year': dates.dt.year.astype('Int16'),
+                'season': pd.to_numeric(matches['season'], errors='coerce').astype('Int16'),
+                'competition': competition.astype('category'),
+                'referee': matches['referee'].astype('category'),
+            })
+
+        long = pd.concat([side(True), side(False)]).sort_values('date', kind='stable').reset_index(drop=True)
+        diff = long['goals_for'].astype('int64') - long['goals_against']
+        long['result'] = pd.Categorical(np.select([diff > 0, diff < 0], ['W', 'L'], 'D'), categories=['W', 'D', 'L'])
+        self._matches = long
+        # Row positions per team rather than per-team copies of the table
+        self._by_team = long.groupby('team', sort=False, observed=True).indices
+
+        self.resolver = resolver or TeamNameResolver(teams)
+        self._referees = {normalize_name(str(name)) for name in long['referee'].cat.categories} - {''}
+        self._competitions = {}
+        for name in long['competition'].cat.categories:
+            if name:
+                normalized = normalize_name(name)
+                self._competitions[normalized] = name
+                self._competitions[normalized.replace('uefa ', '')] = name
+
+    def answer(self, question: str) -> Optional[str]:
+        """Answer `question` from the match table, or return None if it is not a factual query."""
+        text = normalize_name(question)
+        if (_PLAYER.search(text) or _WHY.search(text) or _COMPARISON.search(text)
+                or _UNSUPPORTED_SCOPE.search(text) or _SCORELINE.search(question)
+                or self._mentions_referee(text)):
+            return None
+        teams = self.resolver.find_teams(question)
+        team = teams[0] if teams else None
+        constraints = self._constraints(question, text, teams[1] if len(teams) > 1 else None)
+
+        if _REFEREE.search(text):
+            # Only "which referee most often" style questions; outcomes are not split by referee
+            if not (_TOTAL.search(text) or _MOST.search(text)):
+                return None
+            if any(pattern.search(text) for pattern in (_GOALS, _CONCEDED, _WINS, _DRAWS, _LOSSES, _RECORD)):
+                return None
+            return self._answer_referees(team, constraints)
+        if team is None:
+            return None
+
+        matches = self._filter(self._team_matches(team), constraints)
+        scope = self._describe_scope(team, constraints)
+
+        if _LAST.search(text):
+            # Totals over the last match or details beyond its score go to the LLM
+            if _TOTAL.search(text) or _WHICH.search(text) and _GOALS.search(text):
+                return None
+            if matches.empty:
+                return f"No finished matches found for {scope}."
+            last = matches.iloc[-1]
+            return (f"Last match for {scope}: {last['date']:%Y-%m-%d}, {team} "
+                    f"{last['goals_for']}-{last['goals_against']} vs {last['opponent']} "
+                    f"({'home' if last['is_home'] else 'away'}, {last['competition']}).")
+
+        if _CONCEDED.search(text) or _GOALS.search(text):
+            if not _TOTAL.search(text) or _WHICH.search(text) or _MOST.search(text):
+                return None
+            if _CONCEDED.search(text):
+                return f"{scope} conceded {int(matches['goals_against'].sum())} goals in {len(matches)} matches."
+            return f"{scope} scored {int(matches['goals_for'].sum())} goals in {len(matches)} matches."
+
+        counts = matches['result'].value_counts()
+        wins, draws, losses = (int(counts.get(result, 0)) for result in ('W', 'D', 'L'))
+        if _RECORD.search(text):
+            return f"Record for {scope}: {wins}W {draws}D {losses}L in {len(matches)} matches."
+        if _COUNT.search(text):
+            if _WINS.search(text):
+                return f"{scope} won {wins} of {len(matches)} matches."
+            if _DRAWS.search(text):
+                return f"{scope} drew {draws} of {len(matches)} matches."
+            if _LOSSES.search(text):
+                return f"{scope} lost {losses} of {len(matches)} matches."
+            if _PLAYED.search(text):
+                return f"{scope} played {len(matches)} finished matches ({wins}W {draws}D {losses}L)."
+        return None
+
+    def _team_matches(self, team: str) -> pd.DataFrame:
+        return self._matches.iloc[self._by_team.get(team, [])]
+
+    def _mentions_referee(self, text: str) -> bool:
+        padded = f" {text} "
+        return any(f" {name} " in padded for name in self._referees)
+
+    def _constraints(self, question: str, text: str, opponent: Optional[str]) -> dict:
+        """Opponent, venue, year/season and competition mentioned in a question."""
+        constraints = {'opponent': opponent, 'venue': None, 'year': None, 'season': None, 'competition': None}
+        home, away = _HOME.search(text), _AWAY.search(text)
+        # "home and away" means every match
+        if home and not away:
+            constraints['venue'] = 'home'
+        elif away and not home:
+            constraints['venue'] = 'away'
+        # Years are read from the raw question so "2023/24" keeps its separator
+        year = _YEAR.search(question)
+        if year:
+            key = 'season' if year.group(2) or 'season' in text else 'year'
+            constraints[key] = int(year.group(1))
+        for alias in sorted(self._competitions, key=len, reverse=True):
+            if re.search(rf"\b{re.escape(alias)}\b", text):
+                constraints['competition'] = self._competitions[alias]
+                break
+        return constraints
+
+    def _filter(self, matches: pd.DataFrame, constraints: dict) -> pd.DataFrame:
+        mask = np.ones(len(matches), dtype=bool)
+        if constraints['opponent'] is not None:
+            mask &= (matches['opponent'] == constraints['opponent']).to_numpy(dtype=bool, na_value=False)
+        if constraints['venue'] is not None:
+            mask &= (matches['is_home'] == (constraints['venue'] == 'home')).values
+        for key in ('year', 'season', 'competition'):
+            if constraints[key] is not None:
+                mask &= (matches[key] == constraints[key]).to_numpy(dtype=bool, na_value=False)
+        return matches[mask]
+
+    def _answer_referees(self, team: Optional[str], constraints: dict) -> str:
+        if team is None:
+            # Each match appears once per team in the long table
+            matches = self._filter(self._matches[self._matches['is_home']], constraints)
+        else:
+            matches = self._filter(self._team_matches(team), constraints)
+        counts = matches['referee'].value_counts()
+        counts = counts[counts > 0]
+        scope = self._describe_scope(team, constraints)
+        if counts.empty:
+            return f"No referee data found for {scope}."
+        top = ", ".join(f"{referee} ({count})" for referee, count in counts.head(3).items())
+        return (f"{counts.index[0]} refereed the most matches for {scope} "
+                f"({counts.iloc[0]} of {len(matches)}). Top referees: {top}.")
+
+    @staticmethod
+    def _describe_scope(team: Optional[str], constraints: dict) -> str:
+        parts = [team or "all teams"]
+        if constraints['opponent']:
+            parts.append(f"vs {constraints['opponent']}")
+        if constraints['venue']:
+            parts.append(f"({constraints['venue']})")
+        if constraints['competition']:
+            parts.append(f"in {constraints['competition']}")
+        if constraints['season'] is not None:
+            parts.append(f"in the {constraints['season']}/{(constraints['season'] + 1) % 100:02d} season")
+        elif constraints['year'] is not None:
+            parts.append(f"in {constraints['year']}")
+        return " ".join(parts)
@@ -1,166 +1,971 @@
 
-from typing import Optional
-from prompts import genAI_soccer_prompt_zeroshot
-import faiss
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+from prompts import genAI_soccer_chat_prompt, genAI_soccer_prompt_zeroshot
+import argparse
+import hashlib
+import json
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+import numpy as np
 import pandas as pd
-from tqdm import tqdm
-from llama_index.core import Document, VectorStoreIndex, StorageContext
-from llama_index.vector_stores.faiss import FaissVectorStore
+from llama_index.core import VectorStoreIndex, Settings
+from llama_index.core.schema import QueryBundle, TextNode
+from embeddings import EmbeddingPipeline
+from features import TeamFeatures
+from hybrid_retrieval import HybridRetriever, LexicalIndex
+from index_report import REPORT_INDEX_TYPES, format_report, recall_latency_report
+from match_index import MatchIndex, TeamNameResolver
+from match_store import compact_matches, format_utc_dates, load_matches
+from metrics import Metrics, serve_metrics
+from prediction_cache import PredictionCache
+from prediction_store import PrecomputedPredictions
+from query_router import QueryRouter
+from tokens import count_tokens
+from kb_store import (
+    DEFAULT_INDEX_TYPE,
+    DEFAULT_PERSIST_DIR,
+    MatchFaissVectorStore,
+    create_match_faiss_index,
+    dataframe_key,
+    document_hashes,
+    knowledge_base_key,
+    load_compatible_knowledge_base,
+    load_knowledge_base,
+    persist_knowledge_base,
+    set_search_params,
+)
 
 
 # Setup environment variables
 os.environ['OPENAI_API_KEY'] = 'lm-studio'
 os.environ['OPENAI_API_BASE'] = 'http://localhost:1234/v1'
 
-# Vector dimension (adjust based on your embedding model)
+# Vector dimension used when there are no embeddings to infer it from
 d = 768
 
+# Bump when the context layout built by _format_prompt changes
+PROMPT_FORMAT_REVISION = 3
+
+# Tokens of match context (team statistics plus match lines) put in a prediction prompt
+CONTEXT_TOKEN_BUDGET = int(os.environ.get('SOCCER_CONTEXT_TOKENS', 600))
+
+# Head-to-head and recent matches per team retrieved as candidates for that budget
+CONTEXT_MATCH_LIMIT = 5
+
+# Identifies the prompt template so cached predictions are dropped when it changes
+PROMPT_VERSION = hashlib.sha256(
+    f"{genAI_soccer_prompt_zeroshot}|{PROMPT_FORMAT_REVISION}|{CONTEXT_TOKEN_BUDGET}".encode('utf-8')
+).hexdigest()[:12]
+
+# Columns of the match CSV
+MATCH_COLUMNS = [
+    'season', 'match_id', 'utcDate', 'status', 'matchday', 'stage', 'home_team',
+    'away_team', 'home_score', 'away_score', 'winner', 'referee', 'source_file'
+]
+
+# Competition names keyed by the prefix of the source_file they were loaded from
+COMPETITION_NAMES = {
+    'champions_league': 'UEFA Champions League',
+    'Premier_league': 'Premier League',
+    'LL': 'La Liga',
+    'BL1': 'Bundesliga',
+    'SA': 'Serie A',
+    'FL1': 'Ligue 1',
+}
+
+# Match statuses of fixtures that have not been played yet
+UPCOMING_STATUSES = ('SCHEDULED', 'TIMED')
+
+# Rows embedded and indexed at a time when building the knowledge base
+BUILD_CHUNK_SIZE = 50_000
+
+
+def _int_column(df: pd.DataFrame, column: str) -> pd.Series:
+    """Coerce a numeric column to ints, treating missing or invalid values as 0."""
+    return pd.to_numeric(df[column], errors='coerce').fillna(0).astype('int64').astype(str)
+
+
+def resolve_competition(name: str) -> str:
+    """Map a user-supplied competition name to its canonical name in COMPETITION_NAMES."""
+    for canonical in COMPETITION_NAMES.values():
+        if name.strip().lower() == canonical.lower():
+            return canonical
+    return name
+
+
+def competition_names(source_file: pd.Series) -> pd.Series:
+    """Display competition of each match as a categorical, mapped once per distinct source file."""
+    source_file = source_file.astype('category')
+    names = {
+        category: COMPETITION_NAMES.get(prefix, prefix.replace('_', ' '))
+        for category, prefix in zip(
+            source_file.cat.categories,
+            source_file.cat.categories.astype(str).str.replace('_2023_2025.csv', '', regex=False)
+        )
+    }
+    return source_file.map(names).astype('category')
+
+
+def build_match_documents(df: pd.DataFrame) -> pd.DataFrame:
+    """Render the document text for every match in `df` using column-wise operations.
+
+    Returns a DataFrame with `match_id` (as a string) and `doc_text` columns,
+    plus the metadata columns attached to each match node. Rows without a
+    usable match_id are dropped.
+    """
+    match_ids = pd.to_numeric(df['match_id'], errors='coerce')
+    df = df[match_ids.notna()]
+    match_ids = match_ids[match_ids.notna()].astype('int64').astype(str)
+    
+    home_team = df['home_team'].astype(str)
+    away_team = df['away_team'].astype(str)
+    source_file = df['source_file'].astype(object).fillna('').astype(str)
+    competition = (source_file
+                   .str.replace('_2023_2025.csv', '', regex=False)
+                   .str.replace('_', ' ', regex=False))
+    stage = (df['stage'].str.replace('_', ' ', regex=False).str.title()
+             .fillna('Regular Season'))
+    winner = df['winner'].astype(object).fillna('Not Played').astype(str)
+    winner = winner.where(
+        ~winner.str.contains('_', regex=False),
+        winner.str.replace('_', ' ', regex=False).str.title()
+    )
+    
+    doc_text = (
+        "Match: " + home_team + " vs " + away_team + "\n"
+        + "Competition: " + competition + "\n"
+        + "Stage: " + stage + "\n"
+        + "Season: " + df['season'].astype(str) + "\n"
+        + "Date: " + format_utc_dates(df['utcDate']) + "\n"
+        + "Matchday " + _int_column(df, 'matchday') + "\n"
+        + "Score: " + home_team + " " + _int_column(df, 'home_score') + " - "
+        + _int_column(df, 'away_score') + " " + away_team + "\n"
+        + "Result: " + winner
+    )
+    source_prefix = source_file.str.replace('_2023_2025.csv', '', regex=False)
+    competition_name = source_prefix.map(COMPETITION_NAMES).fillna(competition)
+    return pd.DataFrame({
+        'match_id': match_ids,
+        'doc_text': doc_text,
+        'match_line': _match_lines(df, home_team, away_team, competition_name, stage),
+        'home_team': home_team,
+        'away_team': away_team,
+        'competition': competition_name,
+        'season': df['season'].astype(str),
+        'date': format_utc_dates(df['utcDate']),
+    }, index=df.index)
+
+
+def build_match_lines(df: pd.DataFrame) -> pd.DataFrame:
+    """Render only the one-line prompt form of each match, with `match_id` as a string.
+
+    Cheaper than build_match_documents for the handful of rows in a prompt.
+    """
+    match_ids = pd.to_numeric(df['match_id'], errors='coerce')
+    df = df[match_ids.notna()]
+    stage = df['stage'].str.replace('_', ' ', regex=False).str.title().fillna('Regular Season')
+    competition = df['competition'] if 'competition' in df else competition_names(df['source_file'])
+    lines = _match_lines(df, df['home_team'].astype(str), df['away_team'].astype(str),
+                         competition.astype(object).fillna('').astype(str), stage)
+    return pd.DataFrame({'match_id': match_ids[match_ids.notna()].astype('int64').astype(str), 'match_line': lines},
+                        index=df.index)
+
+
+def _match_lines(df: pd.DataFrame, home_team: pd.Series, away_team: pd.Series, competition: pd.Series,
+                 stage: pd.Series) -> pd.Series:
+    # Dense one-line form used in prompts, e.g. "2024-03-31 Premier League: Manchester City FC 0-0 Arsenal FC"
+    return (
+        format_utc_dates(df['utcDate']).str[:10] + " " + competition
+        + (" " + stage).where(stage != 'Regular Season', "")
+        + ": " + home_team + " "
+        + (_int_column(df, 'home_score') + "-" + _int_column(df, 'away_score')).where(df['winner'].notna(), "vs")
+        + " " + away_team
+    )
+
+
+# Field labels of the prediction format defined in prompts.py
+PREDICTION_FIELDS = ('Prediction', 'Winning Team', 'Predicted Score', 'Reasoning', 'Confidence')
+
+
+def _fixture_key(fixture: dict) -> Tuple[str, str, Optional[str]]:
+    competition = fixture.get('competition')
+    if competition is None or pd.isna(competition) or competition == '':
+        competition = None
+    return fixture['home_team'], fixture['away_team'], competition
+
+
+def load_fixtures(fixtures_path: Optional[str] = None, historical_data_df: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """Load fixtures to predict from a CSV, or take the unplayed rows of the match data.
+
+    A fixture CSV needs `home_team` and `away_team` columns and may have a
+    `competition` column. Without one, SCHEDULED/TIMED matches from
+    `historical_data_df` are used with their competition names resolved.
+    """
+    if fixtures_path:
+        return pd.read_csv(fixtures_path)
+    
+    upcoming = historical_data_df[historical_data_df['status'].isin(UPCOMING_STATUSES)]
+    source_prefix = upcoming['source_file'].astype(object).fillna('').astype(str).str.replace('_2023_2025.csv', '', regex=False)
+    return pd.DataFrame({
+        'match_id': upcoming['match_id'].values,
+        'utcDate': format_utc_dates(upcoming['utcDate']).values,
+        'home_team': upcoming['home_team'].astype(object).values,
+        'away_team': upcoming['away_team'].astype(object).values,
+        'competition': source_prefix.map(COMPETITION_NAMES).values,
+    }).dropna(subset=['home_team', 'away_team'])
+
+
+def write_predictions(results: List[dict], output_path: str):
+    """Write batch prediction results as JSONL, or CSV if the path ends in .csv."""
+    if output_path.endswith('.csv'):
+        pd.DataFrame(results).to_csv(output_path, index=False)
+        return
+    with open(output_path, 'w', encoding='utf-8') as f:
+        for result in results:
+            f.write(json.dumps(result, default=str) + "\n")
+
+
+class PredictionStreamParser:
+    """Incrementally extract the labelled fields of a streamed prediction.
+
+    Feed it text deltas as they arrive; each call returns the (field, value)
+    pairs whose lines were completed by that delta.
+    """
+    
+    def __init__(self):
+        self._buffer = ""
+        self.fields = {}
+    
+    def feed(self, delta: str) -> List[Tuple[str, str]]:
+        self._buffer += delta
+        *lines, self._buffer = self._buffer.split('\n')
+        return self._parse_lines(lines)
+    
+    def finish(self) -> List[Tuple[str, str]]:
+        """Parse whatever is left once the stream has ended."""
+        lines, self._buffer = [self._buffer], ""
+        return self._parse_lines(lines)
+    
+    def _parse_lines(self, lines: List[str]) -> List[Tuple[str, str]]:
+        parsed = []
+        for line in lines:
+            label, sep, value = line.strip().partition(':')
+            if sep and label in PREDICTION_FIELDS:
+                self.fields[label] = value.strip()
+                parsed.append((label, value.strip()))
+        return parsed
+
+
+class ReadWriteLock:
+    """Lock that admits many concurrent readers but gives writers exclusive access.
+
+    Writers take precedence: once one is waiting, new readers block until it
+    has finished, so a steady stream of predictions cannot starve an update.
+    Reads must not be nested, or they can deadlock behind a waiting writer.
+    """
+    
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+    
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+    
+    @contextmanager
+    def write(self):
+        with self._cond:
+            self._writers_waiting += 1
+            try:
+                while self._writer or self._readers:
+                    self._cond.wait()
+            except BaseException:
+                # Release the readers held back for this writer
+                self._writers_waiting -= 1
+                self._cond.notify_all()
+                raise
+            self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
 class SoccerMatchPredictor:
-    def __init__(self, historical_data_path: Optional[str] = None):
+    def __init__(self, historical_data_path: Optional[str] = None, persist_dir: Optional[str] = DEFAULT_PERSIST_DIR,
+                 embedding_pipeline: Optional[EmbeddingPipeline] = None,
+                 prediction_cache: Optional[PredictionCache] = None,
+                 index_type: str = DEFAULT_INDEX_TYPE, search_params: Optional[dict] = None,
+                 metrics: Optional[Metrics] = None, context_token_budget: int = CONTEXT_TOKEN_BUDGET,
+                 precomputed: Optional[PrecomputedPredictions] = None):
         self.index = None
         self.historical_data_df = None
+        self.match_index = None
+        self.team_features = None
+        self.query_router = None
+        self.team_resolver = None
+        self.lexical_index = None
+        self.last_timings = None
+        self.kb_version = None
+        self.prediction_cache = prediction_cache or PredictionCache()
+        # Predictions materialized for upcoming fixtures by PredictionScheduler
+        self.precomputed = precomputed or PrecomputedPredictions()
+        # Stage timings, token/cache/retrieval counters and handled errors
+        self.metrics = metrics or Metrics()
+        self.context_token_budget = context_token_budget
+        self.persist_dir = persist_dir
+        # FAISS index type ('flat', 'ivf', 'hnsw', 'ivfpq', 'ivfsq8' or a factory string)
+        # and optional nprobe/efSearch overrides of the persisted tuning
+        self.index_type = index_type
+        self.search_params = search_params
+        # Predictions may run concurrently; updates get exclusive access
+        self._lock = ReadWriteLock()
+        self.embedding_pipeline = embedding_pipeline or EmbeddingPipeline()
+        # Memory-mapped indexes are read-only and must be reloaded before updates
+        self._index_writable = False
         
         if historical_data_path:
             self.build_knowledge_base(historical_data_path)
     
-    def build_knowledge_base(self, historical_data_path: str):
-        """Build the soccer RAG knowledge base from historical match data."""
+    def build_knowledge_base(self, historical_data_path: str, force_rebuild: bool = False):
+        """Build the soccer RAG knowledge base from historical match data.
+
+        If a persisted index for the same CSV contents and embedding model exists
+        in `persist_dir` it is loaded instead of re-embedding every match. A
+        persisted index built from an older version of the CSV is brought up to
+        date incrementally.
+        """
+        with self._lock.write(), self.metrics.span('build_knowledge_base'):
+            self._build_knowledge_base(historical_data_path, force_rebuild)
+    
+    def _build_knowledge_base(self, historical_data_path: str, force_rebuild: bool):
+        embed_model_name = Settings.embed_model.model_name
+        kb_key = knowledge_base_key(historical_data_path, embed_model_name)
+        if self.persist_dir and not force_rebuild:
+            index = load_knowledge_base(self.persist_dir, kb_key, index_type=self.index_type)
+            if index is not None:
+                self._use_index(index, writable=False)
+                self._set_historical_data(load_matches(historical_data_path, self.persist_dir), kb_key)
+                print(f"Loaded persisted knowledge base from {self.persist_dir}")
+                return
+            
+            index = load_compatible_knowledge_base(self.persist_dir, embed_model_name, self.index_type)
+            if index is not None:
+                print(f"Updating persisted knowledge base from {self.persist_dir}...")
+                self._use_index(index, writable=True)
+                self._set_historical_data(load_matches(historical_data_path, self.persist_dir), kb_key)
+                self._apply_match_updates(self.historical_data_df, remove_missing=True)
+                self._persist(kb_key)
+                return
+        
         print("Building soccer matches knowledge base...")
         
-        # Load historical match data
-        self.historical_data_df = pd.read_csv(historical_data_path)
+        # The compact table is small; embed and index it chunk by chunk so the
+        # nodes and embeddings held at once stay bounded
+        with self.metrics.span('load_data'):
+            df = load_matches(historical_data_path, self.persist_dir)
+        self.index = None
+        for start in range(0, len(df), BUILD_CHUNK_SIZE):
+            nodes = self._create_match_nodes(df.iloc[start:start + BUILD_CHUNK_SIZE])
+            self._embed_nodes(nodes)
+            if self.index is None:
+                # The first chunk fixes the dimension and trains approximate indexes
+                with self.metrics.span('train_index'):
+                    self._create_index(len(nodes[0].embedding) if nodes else d, len(df), nodes)
+            print(f"Indexing {len(nodes)} historical matches...")
+            with self.metrics.span('index_insert'):
+                self.index.insert_nodes(nodes)
+        if self.index is None:
+            self._create_index(d, 0, [])
+        self._set_historical_data(df, kb_key)
+        self._index_writable = True
         
-        # Create documents with match data
-        documents = []
-        for _, row in self.historical_data_df.iterrows():
-            # Format the match information in a structured way
-            try:
-                home_score = 0 if pd.isna(row['home_score']) else int(float(row['home_score']))
-                away_score = 0 if pd.isna(row['away_score']) else int(float(row['away_score']))
-                matchday = 0 if pd.isna(row['matchday']) else int(float(row['matchday']))
-                
-                match_info = {
-                    'home_team': row['home_team'],
-                    'away_team': row['away_team'],
-                    'home_score': home_score,
-                    'away_score': away_score,
-                    'date': row['utcDate'],
-                    'competition': row['source_file'].replace('_2023_2025.csv', '').replace('_', ' '),
-                    'stage': row['stage'].replace('_', ' ').title() if not pd.isna(row['stage']) else 'Regular Season',
-                    'season': str(row['season']),
-                    'matchday': f"Matchday {matchday}",
-                    'winner': row['winner'] if not pd.isna(row['winner']) else 'Not Played'
-                }
-            except Exception as e:
-                print(f"Error processing row: {e}")
-                continue
-            
-            # Create a document with match details and outcome
-            try:
-                doc_text = (
-                    f"Match: {match_info['home_team']} vs {match_info['away_team']}\n"
-                    f"Competition: {match_info['competition']}\n"
-                    f"Stage: {match_info['stage']}\n"
-                    f"Season: {match_info['season']}\n"
-                    f"Date: {match_info['date']}\n"
-                    f"{match_info['matchday']}\n"
-                    f"Score: {match_info['home_team']} {match_info['home_score']} - {match_info['away_score']} {match_info['away_team']}\n"
-                    f"Result: {match_info['winner'].replace('_', ' ').title() if '_' in match_info['winner'] else match_info['winner']}"
-                )
-                documents.append(Document(text=doc_text))
-            except Exception as e:
-                print(f"Error creating document: {e}")
-                continue
+        if self.persist_dir:
+            self._persist(kb_key)
+        print("Knowledge base built successfully!")
+    
+    def _create_index(self, dimension: int, num_vectors: int, training_nodes: List[TextNode]):
+        faiss_index = create_match_faiss_index(dimension, self.index_type, num_vectors, self.search_params)
+        vector_store = MatchFaissVectorStore(faiss_index=faiss_index)
+        if training_nodes:
+            vector_store.train(training_nodes)
+        self.index = VectorStoreIndex.from_vector_store(vector_store)
+    
+    def update_knowledge_base(self, historical_data: Union[str, pd.DataFrame], remove_missing: bool = False) -> dict:
+        """Incrementally update the knowledge base with new or changed matches.
+
+        Rows are matched by `match_id`: only new matches and matches whose
+        details changed (e.g. SCHEDULED -> FINISHED) are embedded, and the
+        vectors they supersede are removed. Matches absent from
+        `historical_data` are kept unless `remove_missing` is set.
+        """
+        if isinstance(historical_data, str) and self.index is None:
+            self.build_knowledge_base(historical_data)
+            return {'added': self.index.vector_store.num_documents, 'updated': 0, 'removed': 0}
+        
+        with self._lock.write():
+            return self._update_knowledge_base(historical_data, remove_missing)
+    
+    def refresh_knowledge_base(self, data_path: str) -> Optional[dict]:
+        """Update from `data_path` unless the knowledge base already reflects its contents.
+
+        Returns the update statistics, or None when the file was unchanged.
+        """
+        if self.index is not None and knowledge_base_key(data_path, Settings.embed_model.model_name) == self.kb_version:
+            return None
+        return self.update_knowledge_base(data_path)
+    
+    def _update_knowledge_base(self, historical_data: Union[str, pd.DataFrame], remove_missing: bool) -> dict:
+        if self.index is None:
+            raise ValueError("Knowledge base not built")
+        
+        if isinstance(historical_data, str):
+            new_df = load_matches(historical_data)
+        else:
+            new_df = compact_matches(historical_data)
+        
+        # Only matches whose document text changed touch FAISS
+        stats = self._apply_match_updates(new_df, remove_missing=remove_missing)
+        
+        # Merge into the existing table, newer rows replacing older ones
+        if self.historical_data_df is not None and not remove_missing:
+            merged_df = pd.concat([self.historical_data_df, new_df], ignore_index=True)
+            merged_df = merged_df.drop_duplicates(subset='match_id', keep='last').reset_index(drop=True)
+            # Concatenating categoricals with different categories falls back to object dtype
+            merged_df = compact_matches(merged_df)
+        else:
+            merged_df = new_df.reset_index(drop=True)
+        
+        # A CSV is keyed like build_knowledge_base keys it, so a restart on the same file loads this index
+        kb_key = (knowledge_base_key(historical_data, Settings.embed_model.model_name)
+                  if isinstance(historical_data, str)
+                  else dataframe_key(merged_df, Settings.embed_model.model_name))
+        if kb_key == self.kb_version:
+            # Same data: keep the version, caches and persisted (possibly memory-mapped) index
+            return stats
+        # Columns outside the document text (status, referee) still change the table and version
+        self._set_historical_data(merged_df, kb_key)
         
-        # Build FAISS index
-        faiss_index = faiss.IndexFlatL2(d)
-        vector_store = FaissVectorStore(faiss_index=faiss_index)
-        storage_context = StorageContext.from_defaults(vector_store=vector_store)
+        if self.persist_dir:
+            self._persist(kb_key)
+        return stats
+    
+    def _apply_match_updates(self, df: pd.DataFrame, remove_missing: bool = False) -> dict:
+        """Diff `df` against the indexed matches and apply the changes to the index.
+
+        Documents are compared by hash, so nodes are only built for new and
+        changed matches.
+        """
+        df = df.reset_index(drop=True)
+        docs = build_match_documents(df)
+        docs = docs[~docs['match_id'].duplicated(keep='last')]
+        hashes = document_hashes(docs['match_id'].astype('int64'), docs['doc_text'])
+        indexed = self.index.vector_store.indexed_hashes
+        
+        is_new = ~hashes.index.isin(indexed.index)
+        is_changed = np.zeros(len(hashes), dtype=bool)
+        is_changed[~is_new] = indexed.reindex(hashes.index[~is_new]).to_numpy() != hashes.to_numpy()[~is_new]
+        added = self._create_match_nodes(df.loc[docs.index[is_new]])
+        updated = self._create_match_nodes(df.loc[docs.index[is_changed]])
+        
+        removed_ids = []
+        if remove_missing:
+            removed_ids = [str(match_id) for match_id in indexed.index.difference(hashes.index)]
+        
+        if (added or updated or removed_ids) and not self._index_writable:
+            self._reload_writable_index()
+        self._remove_match_nodes([node.node_id for node in updated] + removed_ids)
+        if added or updated:
+            print(f"Indexing {len(added) + len(updated)} new or changed matches...")
+            self._embed_nodes(added + updated)
+            with self.metrics.span('index_insert'):
+                self.index.insert_nodes(added + updated)
         
-        print(f"Indexing {len(documents)} historical matches...")
-        self.index = VectorStoreIndex.from_documents(
-            documents, 
-            storage_context=storage_context,
-            show_progress=True
+        stats = {'added': len(added), 'updated': len(updated), 'removed': len(removed_ids)}
+        print(f"Knowledge base updated: {stats}")
+        return stats
+    
+    def _embed_nodes(self, nodes: List[TextNode]):
+        with self.metrics.span('embed'):
+            self.embedding_pipeline.embed_nodes(nodes)
+        stats = self.embedding_pipeline.last_stats or {}
+        self.metrics.increment('documents_embedded_total', stats.get('embedded', 0))
+        self.metrics.increment('embedding_cache_hits_total', stats.get('cached', 0))
+    
+    def _set_historical_data(self, df: pd.DataFrame, kb_version: str):
+        """Replace the match table and rebuild the team/date index over it.
+
+        Cached predictions computed against other data versions are dropped.
+        """
+        self.historical_data_df = df
+        # Document text and prompt lines are rendered on demand for the few matches used
+        competition = competition_names(df['source_file'])
+        self.match_index = MatchIndex(df.assign(competition=competition))
+        self.team_features = TeamFeatures(df)
+        teams = pd.concat([df['home_team'], df['away_team']]).dropna().unique()
+        self.team_resolver = TeamNameResolver(teams)
+        self.query_router = QueryRouter(df.assign(competition=competition), self.team_resolver)
+        # Built from the date-ordered table so equally scored matches rank most recent first
+        self.lexical_index = LexicalIndex(self.match_index.df)
+        self._attach_documents()
+        self.kb_version = kb_version
+        self.prediction_cache.invalidate(kb_version)
+    
+    def _attach_documents(self):
+        """Let the vector store filter on and render result nodes from the current match table."""
+        if self.index is None or self.match_index is None:
+            return
+        matches = self.match_index.df
+        matches = matches[matches['match_id'].notna()]
+        self.index.vector_store.set_documents(
+            matches[['match_id', 'home_team', 'away_team', 'competition', 'season']],
+            lambda match_ids: self._create_match_nodes(self.match_index.by_ids(match_ids))
         )
-        print("Knowledge base built successfully!")
+    
+    def _remove_match_nodes(self, node_ids: List[str]):
+        """Remove matches from the vector store."""
+        if node_ids:
+            self.index.vector_store.delete_nodes(node_ids)
+    
+    def _reload_writable_index(self):
+        """Replace a memory-mapped index with an in-memory copy that can be modified."""
+        index = (load_compatible_knowledge_base(self.persist_dir, Settings.embed_model.model_name, self.index_type)
+                 if self.persist_dir else None)
+        if index is None:
+            raise ValueError("Persisted knowledge base could not be reloaded for updating")
+        self._use_index(index, writable=True)
+    
+    def _use_index(self, index: VectorStoreIndex, writable: bool):
+        """Switch to a loaded index, applying any search parameter overrides."""
+        if self.search_params:
+            set_search_params(index.vector_store.client, self.search_params)
+        self.index = index
+        self._index_writable = writable
+        self._attach_documents()
+    
+    def _persist(self, kb_key: str):
+        with self.metrics.span('persist'):
+            persist_knowledge_base(
+                self.index, self.persist_dir, kb_key,
+                self.index.vector_store.num_documents, Settings.embed_model.model_name, self.index_type
+            )
+        print(f"Knowledge base persisted to {self.persist_dir}")
+    
+    def index_report(self, index_types: Iterable[str] = REPORT_INDEX_TYPES, k: int = 10,
+                     num_queries: int = 200) -> List[dict]:
+        """Compare recall@k and latency of FAISS index types on this knowledge base's embeddings.
+
+        Embeddings come from the embedding pipeline, so with a warm cache no
+        embedding calls are made. The report is printed and returned as rows.
+        """
+        if self.historical_data_df is None:
+            raise ValueError("Knowledge base not built")
+        nodes = self._create_match_nodes(self.historical_data_df)
+        self.embedding_pipeline.embed_nodes(nodes)
+        vectors = np.array([node.embedding for node in nodes], dtype='float32')
+        rows = recall_latency_report(vectors, tuple(index_types), k=k, num_queries=num_queries)
+        print(format_report(rows, k))
+        return rows
+    
+    def _create_match_nodes(self, df: pd.DataFrame) -> List[TextNode]:
+        """Create one node per match, using the match_id as the node id.
+
+        Match metadata is attached for filtering only; it is excluded from the
+        embedded and LLM-facing text, which already contains the same details.
+        """
+        docs = build_match_documents(df)
+        metadata_keys = ['home_team', 'away_team', 'competition', 'season', 'date', 'match_id']
+        return [
+            TextNode(
+                id_=metadata['match_id'],
+                text=doc_text,
+                metadata=metadata,
+                excluded_embed_metadata_keys=metadata_keys,
+                excluded_llm_metadata_keys=metadata_keys
+            )
+            for doc_text, metadata in zip(docs['doc_text'], docs[metadata_keys].to_dict('records'))
+        ]
+    
+    def resolve_team(self, name: str) -> Optional[str]:
+        """Dataset team name for user input such as "man city" or "Atletico", or None if unknown."""
+        return self.team_resolver.resolve(name) if self.team_resolver else None
     
     def predict_match(self, home_team: str, away_team: str, competition: str = None) -> str:
-        """Generate a prediction for a match between two teams using RAG."""
+        """Generate a prediction for a match between two teams using RAG.
+
+        Context is retrieved once and the assembled prompt is sent straight to
+        the LLM. Per-stage latencies of the last call are kept in `last_timings`.
+        Results are cached per fixture, prompt version and knowledge-base version.
+        """
+        return "".join(self.predict_match_stream(home_team, away_team, competition)).strip()
+    
+    def predict_match_stream(self, home_team: str, away_team: str, competition: str = None) -> Iterator[str]:
+        """Stream a prediction as it is generated, yielding text deltas.
+
+        Yields tokens as soon as the LLM produces them; a cached prediction is
+        yielded in one piece. `last_timings` includes time to first token.
+        If generation fails before any text is yielded the statistical baseline
+        is yielded instead; after that the stream ends with an interruption
+        marker and the partial prediction is not cached.
+        """
         if self.index is None:
-            return "ERROR: Knowledge base not built"
+            yield "ERROR: Knowledge base not built"
+            return
+        
+        cache_key = PredictionCache.make_key(home_team, away_team, competition, PROMPT_VERSION, self.kb_version)
+        cached = self._cached_prediction(cache_key, home_team, away_team, competition)
+        if cached is not None:
+            yield cached
+            return
         
+        chunks = []
         try:
-            # Create query about the match, including competition if provided
-            match_query = f"{home_team} vs {away_team}"
-            if competition:
-                match_query += f" in {competition}"
-            
-            # Get retriever results with different strategies
-            retriever = self.index.as_retriever(similarity_top_k=10)  # Get more matches initially
-            retrieved_nodes = retriever.retrieve(match_query)
-            
-            # Filter and sort retrieved matches
-            relevant_matches = []
-            h2h_matches = []
-            recent_home_matches = []
-            recent_away_matches = []
-            
-            for node in retrieved_nodes:
-                match_text = node.text
-                
-                # Check if it's a head-to-head match
-                if (home_team in match_text and away_team in match_text):
-                    h2h_matches.append(node)
-                # Check recent matches of home team
-                elif home_team in match_text:
-                    recent_home_matches.append(node)
-                # Check recent matches of away team
-                elif away_team in match_text:
-                    recent_away_matches.append(node)
-            
-            # Format retrieved examples with categorization
-            historical_matches = ""
-            
-            # Add head-to-head matches first
-            if h2h_matches:
-                historical_matches += "Head-to-Head Matches:\n"
-                for i, node in enumerate(h2h_matches[:3], 1):
-                    historical_matches += f"{node.text}\n\n"
-            
-            # Add recent home team matches
-            if recent_home_matches:
-                historical_matches += f"\nRecent {home_team} Matches:\n"
-                for i, node in enumerate(recent_home_matches[:3], 1):
-                    historical_matches += f"{node.text}\n\n"
+            start = time.perf_counter()
+            # Only retrieval touches the shared index; generation runs unlocked
+            with self._lock.read():
+                context = self._retrieve_context(home_team, away_team, competition)
+            retrieved = time.perf_counter()
+            rag_query = self._format_prompt(home_team, away_team, context)
+            formatted = time.perf_counter()
             
-            # Add recent away team matches
-            if recent_away_matches:
-                historical_matches += f"\nRecent {away_team} Matches:\n"
-                for i, node in enumerate(recent_away_matches[:3], 1):
-                    historical_matches += f"{node.text}\n\n"
+            first_token = None
+            for response in Settings.llm.stream_complete(rag_query):
+                if not response.delta:
+                    continue
+                if first_token is None:
+                    first_token = time.perf_counter()
+                chunks.append(response.delta)
+                yield response.delta
+            generated = time.perf_counter()
             
-            # Construct the RAG query
-            rag_query = f"""
-            {genAI_soccer_prompt_zeroshot}
+            self.last_timings = {
+                'retrieve': retrieved - start,
+                'format': formatted - retrieved,
+                'first_token': (first_token or generated) - formatted,
+                'generate': generated - formatted,
+                'total': generated - start,
+            }
+            print("Prediction timings: " + ", ".join(f"{stage} {seconds * 1000:.0f}ms" for stage, seconds in self.last_timings.items()))
+            for stage, seconds in self.last_timings.items():
+                self.metrics.observe('predict' if stage == 'total' else stage, seconds)
+            self._count_llm_tokens(rag_query, "".join(chunks))
             
-            Here are some relevant historical matches:
+            self.prediction_cache.put(cache_key, "".join(chunks).strip(), self.kb_version)
             
-            {historical_matches}
-            
-            Based on these historical matches, provide a prediction for:
-            {home_team} vs {away_team}
-            """
-            
-            # Use query engine to get response
-            response = self.index.as_query_engine().query(rag_query)
-            
-            return response.response.strip()
+        except Exception as e:
+            self.metrics.record_error('predict', e, home_team=home_team, away_team=away_team)
+            if chunks:
+                # Part of the prediction is already on screen; a baseline appended to it would read as one answer
+                print(f"Prediction Error: {e}, stream interrupted")
+                yield f"\n\n[Prediction interrupted: {e}]"
+            else:
+                print(f"Prediction Error: {e}, falling back to the statistical baseline")
+                yield self.predict_baseline(home_team, away_team)
+    
+    def fixture_data_version(self, home_team: str, away_team: str) -> str:
+        """Version of the data a fixture's prediction depends on: the prompt and both teams' results.
+
+        Unlike `kb_version` it only changes when one of the two teams plays or
+        has a result corrected, so precomputed predictions of other fixtures
+        stay valid across updates.
+        """
+        return hashlib.sha256(
+            f"{PROMPT_VERSION}|{self.match_index.team_version(home_team)}|"
+            f"{self.match_index.team_version(away_team)}".encode('utf-8')
+        ).hexdigest()[:16]
+    
+    def _cached_prediction(self, cache_key: str, home_team: str, away_team: str,
+                           competition: Optional[str]) -> Optional[str]:
+        cached = self.prediction_cache.get(cache_key)
+        result = 'hit'
+        if cached is None:
+            cached = self.precomputed.get(home_team, away_team, competition,
+                                          self.fixture_data_version(home_team, away_team))
+            result = 'precomputed' if cached is not None else 'miss'
+        self.metrics.increment('prediction_cache_requests_total', result=result)
+        return cached
+    
+    def _count_llm_tokens(self, prompt: str, completion: str):
+        self.metrics.increment('llm_requests_total')
+        self.metrics.increment('llm_tokens_sent_total', count_tokens(prompt))
+        self.metrics.increment('llm_tokens_received_total', count_tokens(completion))
+    
+    def predict_baseline(self, home_team: str, away_team: str) -> str:
+        """Predict a match from the Poisson/Elo features alone, without calling the LLM.
+
+        The result uses the same format as LLM predictions so it can be shown
+        wherever those are.
+        """
+        baseline = self.team_features.predict(home_team, away_team)
+        outcomes = {
+            'Home Win': baseline['home_win'],
+            'Draw': baseline['draw'],
+            'Away Win': baseline['away_win'],
+        }
+        outcome = max(outcomes, key=outcomes.get)
+        winner = {'Home Win': home_team, 'Draw': 'Draw', 'Away Win': away_team}[outcome]
+        home_goals, away_goals = baseline['likely_scores'][outcome.lower().replace(' ', '_')]
+        return (
+            f"Prediction: {outcome}\n"
+            f"Winning Team: {winner}\n"
+            f"Predicted Score: {home_team} {home_goals} - {away_goals} {away_team}\n"
+            f"Reasoning: Statistical baseline from venue scoring rates (expected goals "
+            f"{baseline['expected_home_goals']:.2f}-{baseline['expected_away_goals']:.2f}) and Elo ratings "
+            f"({baseline['home_elo']:.0f} vs {baseline['away_elo']:.0f}).\n"
+            f"Confidence: {outcomes[outcome] * 100:.0f}%"
+        )
+    
+    def predict_matches(self, fixtures: Union[pd.DataFrame, Iterable[dict]], max_workers: int = 4,
+                        max_retries: int = 2) -> List[dict]:
+        """Predict a list of fixtures, running LLM calls concurrently.
+
+        `fixtures` is a DataFrame or an iterable of dicts with `home_team`,
+        `away_team` and optionally `competition`. Identical fixtures are
+        predicted once and cached predictions are reused; the remaining
+        prompts go through a bounded thread pool with retries. Returns one
+        result dict per input fixture, in input order, with a `prediction` key.
+        """
+        records = fixtures.to_dict('records') if isinstance(fixtures, pd.DataFrame) else [dict(f) for f in fixtures]
+        keys = [_fixture_key(record) for record in records]
+        unique_keys = list(dict.fromkeys(keys))
+        if self.index is None:
+            return [dict(record, prediction="ERROR: Knowledge base not built") for record in records]
+        
+        start = time.perf_counter()
+        results = {}
+        prompts = {}
+        # Retrieval is cheap and shares the index, so do it up front under one read lock
+        with self._lock.read():
+            for key in unique_keys:
+                cached = self._cached_prediction(PredictionCache.make_key(*key, PROMPT_VERSION, self.kb_version), *key)
+                if cached is not None:
+                    results[key] = cached
+                    continue
+                with self.metrics.span('retrieve'):
+                    context = self._retrieve_context(*key)
+                prompts[key] = self._format_prompt(key[0], key[1], context)
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self._complete_with_retries, prompt, max_retries): key
+                for key, prompt in prompts.items()
+            }
+            for future in as_completed(futures):
+                key = futures[future]
+                try:
+                    prediction = future.result()
+                    self.prediction_cache.put(
+                        PredictionCache.make_key(*key, PROMPT_VERSION, self.kb_version),
+                        prediction, self.kb_version
+                    )
+                except Exception as e:
+                    print(f"Prediction Error for {key[0]} vs {key[1]}: {e}, falling back to the statistical baseline")
+                    self.metrics.record_error('predict', e, home_team=key[0], away_team=key[1])
+                    prediction = self.predict_baseline(key[0], key[1])
+                results[key] = prediction
+        
+        elapsed = time.perf_counter() - start
+        self.metrics.observe('predict_batch', elapsed)
+        rate = len(unique_keys) / elapsed * 60 if elapsed > 0 else 0.0
+        print(f"Predicted {len(unique_keys)} fixtures ({len(unique_keys) - len(prompts)} cached) "
+              f"in {elapsed:.1f}s ({rate:.1f} predictions/min)")
+        return [dict(record, prediction=results[key]) for record, key in zip(records, keys)]
+    
+    def _complete_with_retries(self, prompt: str, max_retries: int, retry_backoff: float = 1.0) -> str:
+        for attempt in range(max_retries + 1):
+            try:
+                with self.metrics.span('generate'):
+                    completion = Settings.llm.complete(prompt).text
+                self._count_llm_tokens(prompt, completion)
+                return completion.strip()
+            except Exception as e:
+                self.metrics.increment('llm_retries_total' if attempt < max_retries else 'llm_failures_total')
+                if attempt == max_retries:
+                    raise
+                delay = retry_backoff * (2 ** attempt)
+                print(f"LLM call failed ({e}), retrying in {delay:.1f}s...")
+                time.sleep(delay)
+    
+    def answer_query(self, question: str) -> str:
+        """Answer a free-text question about the match data.
+
+        Factual questions (goal totals, records, referees, last results) are
+        answered directly from the match table; everything else goes through
+        vector retrieval and the LLM.
+        """
+        return "".join(self.answer_query_stream(question)).strip()
+    
+    def answer_query_stream(self, question: str) -> Iterator[str]:
+        """Stream the answer to a question, yielding text deltas."""
+        if self.index is None:
+            yield "ERROR: Knowledge base not built"
+            return
+        
+        start = time.perf_counter()
+        with self.metrics.span('query_router'):
+            answer = self.query_router.answer(question)
+        self.metrics.increment('queries_total', route='match_data' if answer is not None else 'llm')
+        if answer is not None:
+            print(f"Answered from match data in {(time.perf_counter() - start) * 1000:.1f}ms")
+            yield answer
+            return
+        
+        try:
+            with self._lock.read(), self.metrics.span('query_retrieve'):
+                nodes = HybridRetriever(
+                    self.index, self.lexical_index, self.team_resolver,
+                    similarity_top_k=5, lexical_top_k=5, top_k=5
+                ).retrieve(question)
+                retrieved_ids = {node.node_id for node in nodes}
+                # Ground team questions in their latest results as well
+                recent = [
+                    doc_text
+                    for team in self.team_resolver.find_teams(question)[:2]
+                    for match_id, doc_text in build_match_documents(
+                        self.match_index.recent_matches(team, limit=5)
+                    )[['match_id', 'doc_text']].values
+                    if match_id not in retrieved_ids
+                ]
             
+            matches = "\n\n".join([node.text for node in nodes] + recent)
+            chat_query = f"""
+        {genAI_soccer_chat_prompt}
+        
+        Here are some relevant historical matches:
+        
+        {matches}
+        
+        Question: {question}
+        """
+            chunks = []
+            for response in Settings.llm.stream_complete(chat_query):
+                if response.delta:
+                    chunks.append(response.delta)
+                    yield response.delta
+            self.metrics.observe('query', time.perf_counter() - start)
+            self._count_llm_tokens(chat_query, "".join(chunks))
+            print(f"Answered with retrieval and LLM in {time.perf_counter() - start:.1f}s")
+        
         except Exception as e:
-            print(f"Prediction Error: {e}")
-            return "ERROR: Match prediction failed"
+            print(f"Query Error: {e}")
+            self.metrics.record_error('query', e)
+            yield "Sorry, I couldn't answer that question right now. Please try again."
+    
+    def _retrieve_context(self, home_team: str, away_team: str, competition: str = None) -> dict:
+        """Collect head-to-head, recent-form and hybrid-search matches for a fixture."""
+        # Create query about the match, including competition if provided
+        match_query = f"{home_team} vs {away_team}"
+        if competition:
+            match_query += f" in {competition}"
+        
+        # Exact head-to-head and recent-form lookups from the team/date index
+        with self.metrics.span('match_lookup'):
+            # Fetch more than a prompt usually holds; _format_prompt trims to the token budget
+            h2h_matches = self.match_index.head_to_head(home_team, away_team, limit=CONTEXT_MATCH_LIMIT)
+            h2h_ids = set(h2h_matches['match_id'])
+            recent_home_matches = self.match_index.recent_matches(home_team, limit=CONTEXT_MATCH_LIMIT + len(h2h_ids))
+            recent_home_matches = recent_home_matches[~recent_home_matches['match_id'].isin(h2h_ids)].head(CONTEXT_MATCH_LIMIT)
+            recent_away_matches = self.match_index.recent_matches(away_team, limit=CONTEXT_MATCH_LIMIT + len(h2h_ids))
+            recent_away_matches = recent_away_matches[~recent_away_matches['match_id'].isin(h2h_ids)].head(CONTEXT_MATCH_LIMIT)
+        included_ids = {
+            str(match_id) for match_id in
+            pd.concat([h2h_matches['match_id'], recent_home_matches['match_id'], recent_away_matches['match_id']])
+        }
+        
+        # Hybrid search only supplements the exact lookups. Exact team tokens
+        # keep near-identical names apart, so a small vector top-k suffices
+        retriever = HybridRetriever(
+            self.index, self.lexical_index, self.team_resolver, similarity_top_k=5, lexical_top_k=10,
+            competition=resolve_competition(competition) if competition else None
+        )
+        # Embed the query separately so embedding and search are timed apart
+        with self.metrics.span('query_embedding'):
+            query_embedding = Settings.embed_model.get_query_embedding(match_query)
+        with self.metrics.span('hybrid_search'):
+            retrieved_nodes = retriever.retrieve(QueryBundle(match_query, embedding=query_embedding))
+        related_matches = [node for node in retrieved_nodes if node.node_id not in included_ids]
+        self.metrics.increment('retrieved_matches_total', len(included_ids) + len(related_matches[:3]))
+        
+        return {
+            'h2h': h2h_matches,
+            'recent_home': recent_home_matches,
+            'recent_away': recent_away_matches,
+            'related': related_matches[:3],
+        }
+    
+    def _format_prompt(self, home_team: str, away_team: str, context: dict,
+                       token_budget: Optional[int] = None) -> str:
+        """Render retrieved context into the prediction prompt.
+
+        Team statistics come first, then one line per match in priority order
+        (head-to-head, recent form of both teams, vector-search matches), each
+        match at most once, until `token_budget` tokens of context are used.
+        """
+        budget = self.context_token_budget if token_budget is None else token_budget
+        historical_matches = "Team Statistics:\n" + self.team_features.describe(home_team, away_team)
+        used = count_tokens(historical_matches)
+        
+        related = self.match_index.by_ids([node.node_id for node in context['related']])
+        # Alternate the two teams' recent matches so both keep some form under a tight budget
+        order = np.concatenate([np.arange(len(context['recent_home'])) * 2, np.arange(len(context['recent_away'])) * 2 + 1])
+        recent = pd.concat([context['recent_home'], context['recent_away']]).iloc[np.argsort(order, kind='stable')]
+        sections = [
+            ("Head-to-Head", context['h2h']),
+            ("Recent Form", recent),
+            ("Other Related Matches", related),
+        ]
+        
+        # One rendering pass for all sections; the keys tell their rows apart
+        docs = build_match_lines(pd.concat([matches for _, matches in sections], keys=range(len(sections))))
+        
+        seen = set()
+        dropped = 0
+        for number, (title, _) in enumerate(sections):
+            lines = []
+            section_docs = docs.loc[[number]] if number in docs.index.get_level_values(0) else docs.iloc[0:0]
+            for match_id, line in section_docs[['match_id', 'match_line']].values:
+                if str(match_id) in seen:
+                    continue
+                cost = count_tokens(line) + (0 if lines else count_tokens(title) + 2)
+                if used + cost > budget:
+                    dropped += 1
+                    continue
+                seen.add(str(match_id))
+                lines.append(line)
+                used += cost
+            if lines:
+                historical_matches += f"\n\n{title}:\n" + "\n".join(lines)
+        self.metrics.increment('context_matches_total', len(seen))
+        self.metrics.increment('context_matches_dropped_total', dropped)
+        self.metrics.increment('context_tokens_total', used)
+        
+        # Construct the RAG query
+        return f"""{genAI_soccer_prompt_zeroshot}
+Here are some relevant historical matches (date competition: home score-score away):
+
+{historical_matches}
+
+Based on these historical matches, provide a prediction for:
+{home_team} vs {away_team}
+"""
 
 def interactive_predictions():
     """Interactive command-line interface for match predictions."""
@@ -172,8 +977,7 @@ def interactive_predictions():
         
         while True:
             print("\n=== Soccer Match Predictor ===")
-            print("Enter team names as they appear in the official data")
-            print("For example: 'Arsenal FC' instead of 'Arsenal'")
+            print("Enter team names, e.g. 'Arsenal' or 'Man City'")
             
             home_team = input("Enter home team (or 'quit' to exit): ").strip()
             if home_team.lower() == 'quit':
@@ -181,8 +985,15 @@ def interactive_predictions():
                 
             away_team = input("Enter away team: ").strip()
             
-            competitions = ['UEFA Champions League', 'Premier League', 'La Liga', 
-                          'Bundesliga', 'Serie A', 'Ligue 1']
+            resolved = [predictor.resolve_team(home_team), predictor.resolve_team(away_team)]
+            if None in resolved:
+                unknown = [name for name, team in zip((home_team, away_team), resolved) if team is None]
+                print(f"Unknown team: {', '.join(unknown)}")
+                continue
+            home_team, away_team = resolved
+            print(f"Predicting {home_team} vs {away_team}")
+            
+            competitions = list(COMPETITION_NAMES.values())
             print("\nCompetitions:")
             for i, comp in enumerate(competitions, 1):
                 print(f"{i}. {comp}")
@@ -193,11 +1004,11 @@ def interactive_predictions():
                 competition = competitions[int(comp_choice) - 1]
             
             print("\nGenerating prediction...")
-            prediction = predictor.predict_match(home_team, away_team, competition)
-            
             print("\nPrediction:")
             print("-" * 50)
-            print(prediction)
+            for token in predictor.predict_match_stream(home_team, away_team, competition):
+                print(token, end="", flush=True)
+            print()
             print("-" * 50)
             
     except Exception as e:
@@ -206,9 +1017,48 @@ def interactive_predictions():
 
 
 if __name__ == "__main__":
-    # Test the predictor
-    predictor = SoccerMatchPredictor()
-    predictor.build_knowledge_base('combined_leagues.csv')
+    parser = argparse.ArgumentParser(description="Soccer match predictor")
+    parser.add_argument('--data', default='combined_leagues.csv', help="Historical match data CSV")
+    parser.add_argument('--batch', action='store_true',
+                        help="Predict a whole fixture list instead of the example match")
+    parser.add_argument('--fixtures', help="Fixture CSV for --batch (default: scheduled matches in --data)")
+    parser.add_argument('--output', default='predictions.jsonl', help="Output file for --batch (.jsonl or .csv)")
+    parser.add_argument('--workers', type=int, default=4, help="Concurrent LLM calls for --batch")
+    parser.add_argument('--index-type', default=DEFAULT_INDEX_TYPE,
+                        help="FAISS index: flat, ivf, hnsw, ivfpq, ivfsq8 or a faiss factory string")
+    parser.add_argument('--nprobe', type=int, help="IVF lists searched per query")
+    parser.add_argument('--ef-search', type=int, help="HNSW search breadth")
+    parser.add_argument('--index-report', action='store_true',
+                        help="Report recall@10 vs latency of each index type against exact search")
+    parser.add_argument('--metrics-port', type=int, help="Serve Prometheus metrics on this port while running")
+    parser.add_argument('--metrics-output', help="Write a JSON metrics snapshot to this file on exit")
+    parser.add_argument('--home', default="Manchester City FC", help="Home team of the single prediction")
+    parser.add_argument('--away', default="Arsenal FC", help="Away team of the single prediction")
+    parser.add_argument('--competition', help="Competition of the single prediction")
+    args = parser.parse_args()
+    
+    search_params = {key: value for key, value in (('nprobe', args.nprobe), ('efSearch', args.ef_search)) if value}
+    predictor = SoccerMatchPredictor(index_type=args.index_type, search_params=search_params or None)
+    if args.metrics_port:
+        serve_metrics(predictor.metrics, args.metrics_port)
+    predictor.build_knowledge_base(args.data)
+    
+    if args.index_report:
+        predictor.index_report()
+    elif args.batch:
+        fixtures = load_fixtures(args.fixtures, predictor.historical_data_df)
+        results = predictor.predict_matches(fixtures, max_workers=args.workers)
+        write_predictions(results, args.output)
+        print(f"Wrote {len(results)} predictions to {args.output}")
+    else:
+        # Team names may be abbreviated or misspelled ("man city", "Arsneal")
+        home_team, away_team = predictor.resolve_team(args.home), predictor.resolve_team(args.away)
+        if home_team is None or away_team is None:
+            parser.error(f"Unknown team: {args.home if home_team is None else args.away}")
+        print(f"Predicting {home_team} vs {away_team}")
+        print(predictor.predict_match(home_team, away_team, args.competition))
     
-    # Example prediction
-    print(predictor.predict_match("Manchester City FC", "Arsenal FC"))
\ No newline at end of file
+    if args.metrics_output:
+        with open(args.metrics_output, 'w', encoding='utf-8') as f:
+            f.write(predictor.metrics.to_json())
+        print(f"Wrote metrics to {args.metrics_output}")
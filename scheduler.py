@@ -0,0 +1,157 @@
+import argparse
+import os
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+from prediction_store import PrecomputedPredictions
+from ragv2 import SoccerMatchPredictor, _fixture_key, load_fixtures
+
+
+# Local hours (start, end) in which precomputation may run, e.g. SOCCER_OFF_PEAK_HOURS=1-6;
+# the window may wrap past midnight (22-5)
+DEFAULT_OFF_PEAK_HOURS = tuple(
+    int(hour) for hour in os.environ.get('SOCCER_OFF_PEAK_HOURS', '1-6').split('-')
+)
+
+# Seconds between checks for stale fixtures
+DEFAULT_INTERVAL = 15 * 60
+
+# Fixtures predicted and stored per step, so progress survives a stop mid-run
+PRECOMPUTE_CHUNK_SIZE = 20
+
+
+class PredictionScheduler:
+    """Background worker that materializes predictions for upcoming fixtures.
+
+    Each run takes the scheduled fixtures from the predictor's match data,
+    compares every fixture's data version with the stored one and predicts
+    only those that are new or whose teams have new results. Fixtures that
+    have since been played are removed from the store.
+    """
+
+    def __init__(self, predictor: SoccerMatchPredictor, store: Optional[PrecomputedPredictions] = None,
+                 interval_seconds: float = DEFAULT_INTERVAL,
+                 off_peak_hours: Optional[Tuple[int, int]] = DEFAULT_OFF_PEAK_HOURS,
+                 max_workers: int = 2, before_run: Optional[Callable[[], None]] = None):
+        self.predictor = predictor
+        self.store = store or predictor.precomputed
+        self.interval_seconds = interval_seconds
+        self.off_peak_hours = off_peak_hours
+        self.max_workers = max_workers
+        # Called before each scheduled run, e.g. to pull new results into the knowledge base
+        self.before_run = before_run
+        self._stop = threading.Event()
+        self._thread = None
+
+    def in_off_peak(self, hour: Optional[int] = None) -> bool:
+        if not self.off_peak_hours:
+            return True
+        hour = time.localtime().tm_hour if hour is None else hour
+        start, end = self.off_peak_hours
+        return start <= hour < end if start <= end else hour >= start or hour < end
+
+    def run_once(self) -> dict:
+        """Bring the store up to date with the current match data. Returns run statistics."""
+        predictor = self.predictor
+        if predictor.historical_data_df is None:
+            return {}
+        start = time.perf_counter()
+        fixtures = load_fixtures(None, predictor.historical_data_df).to_dict('records')
+        stored = self.store.versions()
+
+        stale = []
+        current_keys = []
+        for fixture in fixtures:
+            home_team, away_team, competition = _fixture_key(fixture)
+            current_keys.append((home_team, away_team, competition or ''))
+            version = predictor.fixture_data_version(home_team, away_team)
+            if stored.get(current_keys[-1]) != version:
+                stale.append({
+                    'home_team': home_team,
+                    'away_team': away_team,
+                    'competition': competition,
+                    'match_id': str(fixture['match_id']),
+                    'utc_date': fixture['utcDate'],
+                    'data_version': version,
+                })
+        removed = self.store.retain(current_keys)
+
+        stored_count = 0
+        for offset in range(0, len(stale), PRECOMPUTE_CHUNK_SIZE):
+            if self._stop.is_set():
+                break
+            results = predictor.predict_matches(stale[offset:offset + PRECOMPUTE_CHUNK_SIZE],
+                                                max_workers=self.max_workers)
+            # Baseline fallbacks mean the LLM failed; leave them for the next run
+            results = [
+                result for result in results
+                if result['prediction'] != predictor.predict_baseline(result['home_team'], result['away_team'])
+            ]
+            self.store.put_many(results)
+            stored_count += len(results)
+
+        stats = {
+            'fixtures': len(fixtures),
+            'up_to_date': len(fixtures) - len(stale),
+            'recomputed': stored_count,
+            'pending': len(stale) - stored_count,
+            'removed': removed,
+            'seconds': time.perf_counter() - start,
+        }
+        predictor.metrics.observe('precompute', stats['seconds'])
+        predictor.metrics.increment('precomputed_predictions_total', stored_count)
+        print(f"Precomputed {stats['recomputed']} of {stats['fixtures']} upcoming fixtures "
+              f"({stats['up_to_date']} up to date, {stats['removed']} removed) in {stats['seconds']:.1f}s")
+        return stats
+
+    def start(self):
+        """Run in a daemon thread until `stop()`."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='prediction-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            if self.in_off_peak():
+                try:
+                    if self.before_run is not None:
+                        self.before_run()
+                    self.run_once()
+                except Exception as e:
+                    print(f"Precompute Error: {e}")
+                    self.predictor.metrics.record_error('precompute', e)
+            self._stop.wait(self.interval_seconds)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute predictions for upcoming fixtures")
+    parser.add_argument('--data', default='combined_leagues.csv', help="Historical match data CSV")
+    parser.add_argument('--once', action='store_true', help="Run once now, ignoring the off-peak window")
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL, help="Seconds between runs")
+    parser.add_argument('--workers', type=int, default=2, help="Concurrent LLM calls")
+    args = parser.parse_args()
+
+    predictor = SoccerMatchPredictor()
+    predictor.build_knowledge_base(args.data)
+    scheduler = PredictionScheduler(
+        predictor, interval_seconds=args.interval, max_workers=args.workers,
+        # Pick up new results from the data file so only affected fixtures are recomputed
+        before_run=lambda: predictor.refresh_knowledge_base(args.data)
+    )
+    if args.once:
+        scheduler.run_once()
+    else:
+        scheduler.start()
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            scheduler.stop()
@@ -0,0 +1,215 @@
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+from ragv2 import SoccerMatchPredictor, _fixture_key
+from scheduler import PredictionScheduler
+
+
+# LLM calls run at once; the local model backend serves few requests in parallel
+DEFAULT_MAX_CONCURRENCY = 4
+
+# Predictions admitted (running or waiting) before new ones are rejected with 503
+DEFAULT_MAX_PENDING = 64
+
+# Largest fixture list accepted by /predict/batch
+MAX_BATCH_SIZE = 500
+
+
+class ServiceOverloaded(Exception):
+    """Raised when accepting a request would exceed the pending-prediction limit."""
+
+
+class PredictionService:
+    """Asyncio front end over a shared SoccerMatchPredictor.
+
+    Predictor calls block, so they run on a thread pool behind a semaphore of
+    `max_concurrency`. Requests for a fixture that is already being predicted
+    await the same future instead of calling the LLM again, and once
+    `max_pending` distinct predictions are admitted new ones are rejected so
+    callers back off instead of queueing without bound.
+    """
+
+    def __init__(self, predictor: SoccerMatchPredictor, max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 max_pending: int = DEFAULT_MAX_PENDING):
+        self.predictor = predictor
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='predict')
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._inflight: Dict[Tuple[str, str, Optional[str]], asyncio.Future] = {}
+        self._pending = 0
+
+    @property
+    def metrics(self):
+        return self.predictor.metrics
+
+    async def predict(self, home_team: str, away_team: str, competition: Optional[str] = None) -> str:
+        key = _fixture_key({'home_team': home_team, 'away_team': away_team, 'competition': competition})
+        self._admit([key])
+        return await self._predict(key)
+
+    async def predict_batch(self, fixtures: List[dict]) -> List[dict]:
+        """Predict fixtures concurrently; the whole batch is admitted or rejected at once."""
+        keys = [_fixture_key(fixture) for fixture in fixtures]
+        self._admit(keys)
+        predictions = await asyncio.gather(*(self._predict(key) for key in keys))
+        return [dict(fixture, prediction=prediction) for fixture, prediction in zip(fixtures, predictions)]
+
+    async def answer(self, question: str) -> str:
+        self._admit([None])
+        self._pending += 1
+        try:
+            return await self._run(self.predictor.answer_query, question)
+        finally:
+            self._pending -= 1
+
+    def _admit(self, keys: list):
+        """Reject the request if its new (not in-flight) work would exceed max_pending."""
+        new = len({key for key in keys if key is None or key not in self._inflight})
+        if self._pending + new > self.max_pending:
+            self.metrics.increment('service_rejected_total')
+            raise ServiceOverloaded(f"{self._pending} requests pending, limit is {self.max_pending}")
+
+    async def _predict(self, key: Tuple[str, str, Optional[str]]) -> str:
+        task = self._inflight.get(key)
+        if task is None:
+            # The prediction runs as its own task so a disconnecting caller
+            # does not cancel it for the others waiting on the same fixture
+            task = asyncio.ensure_future(self._run(self.predictor.predict_match, *key))
+            self._inflight[key] = task
+            self._pending += 1
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.metrics.increment('service_coalesced_total')
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Tuple[str, str, Optional[str]], task: asyncio.Future):
+        self._pending -= 1
+        del self._inflight[key]
+        if not task.cancelled():
+            # Mark the exception retrieved; every waiter already receives it
+            task.exception()
+
+    async def _run(self, func, *args):
+        async with self._semaphore:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _fixture_from_json(data) -> dict:
+    if not isinstance(data, dict) or not data.get('home_team') or not data.get('away_team'):
+        raise web.HTTPBadRequest(text="Each fixture needs home_team and away_team")
+    return {
+        'home_team': str(data['home_team']),
+        'away_team': str(data['away_team']),
+        'competition': data.get('competition') or None,
+    }
+
+
+async def _json_body(request: web.Request):
+    try:
+        return await request.json()
+    except ValueError:
+        raise web.HTTPBadRequest(text="Request body must be JSON")
+
+
+def create_app(service: PredictionService) -> web.Application:
+    """aiohttp application exposing the prediction service.
+
+    POST /predict        {"home_team", "away_team", "competition"?}
+    POST /predict/batch  {"fixtures": [...]}
+    POST /query          {"question"}
+    GET  /health, GET /metrics
+    """
+
+    async def predict(request: web.Request) -> web.Response:
+        fixture = _fixture_from_json(await _json_body(request))
+        prediction = await service.predict(fixture['home_team'], fixture['away_team'], fixture['competition'])
+        return web.json_response(dict(fixture, prediction=prediction))
+
+    async def predict_batch(request: web.Request) -> web.Response:
+        data = await _json_body(request)
+        fixtures = data.get('fixtures') if isinstance(data, dict) else None
+        if not isinstance(fixtures, list) or not fixtures:
+            raise web.HTTPBadRequest(text="Body needs a non-empty 'fixtures' list")
+        if len(fixtures) > MAX_BATCH_SIZE:
+            raise web.HTTPRequestEntityTooLarge(max_size=MAX_BATCH_SIZE, actual_size=len(fixtures),
+                                                text=f"At most {MAX_BATCH_SIZE} fixtures per batch")
+        results = await service.predict_batch([_fixture_from_json(fixture) for fixture in fixtures])
+        return web.json_response({'predictions': results})
+
+    async def query(request: web.Request) -> web.Response:
+        data = await _json_body(request)
+        question = data.get('question') if isinstance(data, dict) else None
+        if not isinstance(question, str) or not question.strip():
+            raise web.HTTPBadRequest(text="Body needs a 'question'")
+        return web.json_response({'question': question, 'answer': await service.answer(question)})
+
+    async def health(request: web.Request) -> web.Response:
+        ready = service.predictor.index is not None
+        return web.json_response({'status': 'ok' if ready else 'not ready', 'kb_version': service.predictor.kb_version},
+                                 status=200 if ready else 503)
+
+    async def metrics(request: web.Request) -> web.Response:
+        return web.Response(text=service.metrics.to_prometheus(), content_type='text/plain')
+
+    @web.middleware
+    async def count_requests(request: web.Request, handler):
+        status = 500
+        try:
+            with service.metrics.span('http_request', path=request.path):
+                response = await handler(request)
+            status = response.status
+            return response
+        except ServiceOverloaded as e:
+            status = 503
+            raise web.HTTPServiceUnavailable(text=str(e), headers={'Retry-After': '1'})
+        except web.HTTPException as e:
+            status = e.status
+            raise
+        finally:
+            service.metrics.increment('http_requests_total', path=request.path, status=status)
+
+    async def on_cleanup(app: web.Application):
+        service.close()
+
+    app = web.Application(middlewares=[count_requests])
+    app.add_routes([
+        web.post('/predict', predict),
+        web.post('/predict/batch', predict_batch),
+        web.post('/query', query),
+        web.get('/health', health),
+        web.get('/metrics', metrics),
+    ])
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HTTP prediction service")
+    parser.add_argument('--data', default='combined_leagues.csv', help="Historical match data CSV")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--max-concurrency', type=int, default=DEFAULT_MAX_CONCURRENCY,
+                        help="LLM calls run at the same time")
+    parser.add_argument('--max-pending', type=int, default=DEFAULT_MAX_PENDING,
+                        help="Predictions admitted before requests are rejected with 503")
+    parser.add_argument('--precompute', action='store_true',
+                        help="Precompute upcoming fixtures in the background during off-peak hours")
+    args = parser.parse_args()
+
+    predictor = SoccerMatchPredictor()
+    predictor.build_knowledge_base(args.data)
+    if args.precompute:
+        PredictionScheduler(predictor, before_run=lambda: predictor.refresh_knowledge_base(args.data)).start()
+
+    async def make_app() -> web.Application:
+        # The service's semaphore must be created inside the running loop
+        return create_app(PredictionService(predictor, args.max_concurrency, args.max_pending))
+
+    web.run_app(make_app(), host=args.host, port=args.port)
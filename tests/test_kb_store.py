@@ -0,0 +1,124 @@
+import os
+
+import pandas as pd
+import pytest
+from llama_index.core import Settings
+from llama_index.core.llms import MockLLM
+from llama_index.core.vector_stores import VectorStoreQuery
+
+from benchmark import StubEmbedding
+from embeddings import EmbeddingPipeline
+from kb_store import STORE_DIR_PREFIX, read_manifest
+from prediction_cache import PredictionCache
+from prediction_store import PrecomputedPredictions
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'combined_leagues.csv')
+
+
+@pytest.fixture
+def predictor_factory(tmp_path):
+    Settings.embed_model = StubEmbedding(model_name='stub', embed_dim=32)
+    Settings.llm = MockLLM(max_tokens=8)
+    from ragv2 import SoccerMatchPredictor
+
+    def make(index_type):
+        return SoccerMatchPredictor(
+            persist_dir=str(tmp_path / 'storage'),
+            embedding_pipeline=EmbeddingPipeline(cache_path=None),
+            prediction_cache=PredictionCache(max_entries=0, disk_path=None),
+            precomputed=PrecomputedPredictions(path=None),
+            index_type=index_type,
+            search_params={'nprobe': 4096},
+        )
+    return make
+
+
+def _nearest_id(predictor, match_id: str) -> str:
+    vector_store = predictor.index.vector_store
+    embedding = Settings.embed_model.get_text_embedding(predictor.index.vector_store.get_nodes([match_id])[0].get_content())
+    result = vector_store.query(VectorStoreQuery(query_embedding=embedding, similarity_top_k=1))
+    return result.ids[0]
+
+
+@pytest.mark.parametrize('index_type', ['flat', 'ivf', 'hnsw'])
+def test_repeated_updates_keep_search_ids_in_sync(predictor_factory, tmp_path, index_type):
+    df = pd.read_csv(DATA_PATH)
+    csv_path = tmp_path / 'matches.csv'
+    df.to_csv(csv_path, index=False)
+    predictor = predictor_factory(index_type)
+    predictor.build_knowledge_base(str(csv_path))
+
+    played = df.index[df['winner'].notna()]
+    checked = [str(df.loc[i, 'match_id']) for i in played[[0, 100, 1000, -1]]]
+    for round_number, rows in enumerate((played[10:12], played[20:23])):
+        changed = df.copy()
+        changed.loc[rows, 'home_score'] = changed.loc[rows, 'home_score'] + 10 + round_number
+        stats = predictor.update_knowledge_base(changed)
+        assert stats['updated'] == len(rows)
+        df = changed
+        for match_id in checked + [str(df.loc[i, 'match_id']) for i in rows]:
+            assert _nearest_id(predictor, match_id) == match_id
+
+    assert predictor.index.vector_store._faiss_index.ntotal == predictor.index.vector_store.num_documents
+
+
+def test_unchanged_csv_update_keeps_version_and_memory_mapped_index(predictor_factory, tmp_path):
+    csv_path = tmp_path / 'matches.csv'
+    pd.read_csv(DATA_PATH).to_csv(csv_path, index=False)
+    predictor_factory('flat').build_knowledge_base(str(csv_path))
+
+    predictor = predictor_factory('flat')
+    predictor.build_knowledge_base(str(csv_path))
+    version = predictor.kb_version
+    assert not predictor._index_writable
+
+    stats = predictor.update_knowledge_base(str(csv_path))
+    assert stats == {'added': 0, 'updated': 0, 'removed': 0}
+    assert predictor.kb_version == version
+    assert not predictor._index_writable
+    assert predictor.refresh_knowledge_base(str(csv_path)) is None
+
+
+def test_status_only_change_updates_table_and_version(predictor_factory, tmp_path):
+    df = pd.read_csv(DATA_PATH)
+    csv_path = tmp_path / 'matches.csv'
+    df.to_csv(csv_path, index=False)
+    predictor = predictor_factory('flat')
+    predictor.build_knowledge_base(str(csv_path))
+    version = predictor.kb_version
+
+    scheduled = df.index[df['status'] == 'SCHEDULED'][0]
+    df.loc[scheduled, 'status'] = 'POSTPONED'
+    df.to_csv(csv_path, index=False)
+    predictor.refresh_knowledge_base(str(csv_path))
+
+    match_id = df.loc[scheduled, 'match_id']
+    table = predictor.historical_data_df
+    assert table.loc[table['match_id'] == match_id, 'status'].iloc[0] == 'POSTPONED'
+    assert predictor.kb_version != version
+    assert predictor.refresh_knowledge_base(str(csv_path)) is None
+
+
+def test_persist_swaps_in_a_new_store_without_touching_the_loaded_one(predictor_factory, tmp_path):
+    df = pd.read_csv(DATA_PATH)
+    csv_path = tmp_path / 'matches.csv'
+    df.to_csv(csv_path, index=False)
+    predictor_factory('flat').build_knowledge_base(str(csv_path))
+    reader = predictor_factory('flat')
+    reader.build_knowledge_base(str(csv_path))
+    match_id = str(df.loc[df['winner'].notna()].iloc[0]['match_id'])
+    loaded_store = read_manifest(str(tmp_path / 'storage'))['store']
+
+    writer = predictor_factory('flat')
+    writer.build_knowledge_base(str(csv_path))
+    for round_number in range(3):
+        changed = df.copy()
+        changed.loc[changed['winner'].notna(), 'home_score'] += round_number + 1
+        writer.update_knowledge_base(changed)
+
+    stores = sorted(p.name for p in (tmp_path / 'storage').iterdir() if p.name.startswith(STORE_DIR_PREFIX))
+    manifest = read_manifest(str(tmp_path / 'storage'))
+    assert stores == sorted([manifest['store'], manifest['previous_store']])
+    assert loaded_store not in stores
+    # The reader's memory-mapped index was never overwritten in place
+    assert _nearest_id(reader, match_id) == match_id
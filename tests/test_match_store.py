@@ -0,0 +1,14 @@
+import os
+
+import pandas as pd
+
+from match_store import compact_matches, read_matches_csv
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'combined_leagues.csv')
+
+
+def test_chunked_csv_read_matches_whole_file_read():
+    whole = compact_matches(pd.read_csv(DATA_PATH))
+    # Small chunks see only some teams and referees each, so their categories must be unioned
+    chunked = read_matches_csv(DATA_PATH, chunksize=97)
+    pd.testing.assert_frame_equal(chunked, whole)
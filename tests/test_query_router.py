@@ -0,0 +1,44 @@
+import os
+
+import pytest
+
+from match_store import load_matches
+from query_router import QueryRouter
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'combined_leagues.csv')
+
+
+@pytest.fixture(scope='module')
+def router():
+    df = load_matches(DATA_PATH)
+    return QueryRouter(df.assign(competition=df['source_file'].astype(str)))
+
+
+@pytest.mark.parametrize('question, expected', [
+    # Answered from the table; the expected text pins the scope the router applied
+    ("How many goals did Arsenal FC score in 2024?", "Arsenal FC in 2024 scored"),
+    ("How many home wins did Arsenal have?", "Arsenal FC (home) won"),
+    ("How many home goals did Arsenal score?", "Arsenal FC (home) scored 133 goals"),
+    ("Arsenal's home record?", "Record for Arsenal FC (home):"),
+    ("How many goals did Man City concede away?", "Manchester City FC (away) conceded"),
+    ("How many wins did Arsenal have away from home?", "Arsenal FC (away) won"),
+    ("What is Arsenal's record against Chelsea?", "Record for Arsenal FC vs Chelsea FC:"),
+    ("What was Liverpool's last match?", "Last match for Liverpool FC:"),
+    ("Which referee officiated the most Arsenal matches?", "refereed the most matches for Arsenal FC"),
+    # Left to the LLM
+    ("How many matches did Arsenal win 3-0?", None),
+    ("How many games did Arsenal win by more than two goals?", None),
+    ("How many clean sheets did Arsenal keep?", None),
+    ("Who scored the most goals for Arsenal?", None),
+    ("Why did Arsenal score so few goals in 2024?", None),
+    ("Which player scored for Liverpool in their last match?", None),
+    ("Is Arsenal's home record better than Chelsea's?", None),
+    ("Did Barcelona lose more often with referee Gil Manzano?", None),
+    ("How many goals did Arsenal score this season?", None),
+])
+def test_routes(router, question, expected):
+    answer = router.answer(question)
+    if expected is None:
+        assert answer is None
+    else:
+        assert answer is not None and expected in answer
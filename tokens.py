@@ -0,0 +1,39 @@
+import threading
+from typing import Optional
+
+
+# tiktoken encoding used to count prompt and completion tokens
+TOKEN_ENCODING = 'cl100k_base'
+
+# Characters per token assumed when the tiktoken encoding cannot be loaded
+CHARS_PER_TOKEN = 4
+
+_encoder = None
+_encoder_loaded = False
+_encoder_lock = threading.Lock()
+
+
+def _get_encoder():
+    """Load the tiktoken encoding once; None if tiktoken or its data files are unavailable."""
+    global _encoder, _encoder_loaded
+    if not _encoder_loaded:
+        with _encoder_lock:
+            if not _encoder_loaded:
+                try:
+                    import tiktoken
+                    _encoder = tiktoken.get_encoding(TOKEN_ENCODING)
+                except Exception as e:
+                    print(f"tiktoken encoding unavailable ({type(e).__name__}), estimating token counts")
+                    _encoder = None
+                _encoder_loaded = True
+    return _encoder
+
+
+def count_tokens(text: Optional[str]) -> int:
+    """Number of tokens in `text`, estimated from its length if tiktoken is unavailable."""
+    if not text:
+        return 0
+    encoder = _get_encoder()
+    if encoder is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(encoder.encode(text, disallowed_special=()))